@@ -0,0 +1,61 @@
+# benchmarks/fixtures.py
+
+import random
+import subprocess
+import numpy as np
+from pydub import AudioSegment
+
+WORDS = (
+    "money interest loan rate bank price market inflation debt credit payday fee cash budget "
+    "economy tax wage supply demand stock bond risk value cost the a your my like just really "
+    "basically because so and but when you they we it"
+).split()
+
+WORD_MS = 280
+GAP_MS = 70
+
+
+def synthetic_script(n_lines: int, seed: int = 0) -> str:
+    """Stewie/Peter dialogue of n_lines in the generator's output format."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(n_lines):
+        speaker = "Stewie" if i % 2 == 0 else "Peter"
+        words = [rng.choice(WORDS) for _ in range(rng.randint(6, 14))]
+        words[0] = words[0].capitalize()
+        lines.append(f"{speaker}: {' '.join(words)}{'?' if speaker == 'Stewie' else '.'}")
+    return "\n".join(lines)
+
+
+def synthetic_speech(n_words: int, frame_rate: int = 44100, seed: int = 0) -> AudioSegment:
+    """
+    Speech-like mono audio: one voiced burst (a buzzy harmonic tone with a
+    syllable-rate envelope and some noise) per word, separated by short
+    gaps, so loudness, DSP and energy-based alignment behave as on real TTS.
+    """
+    rng = np.random.default_rng(seed + n_words)
+    word_n = frame_rate * WORD_MS // 1000
+    gap_n = frame_rate * GAP_MS // 1000
+    t = np.arange(word_n) / frame_rate
+    envelope = np.sin(np.pi * t / t[-1]) ** 0.5 * (0.75 + 0.25 * np.sin(2 * np.pi * 4 * t))
+
+    pieces = []
+    for _ in range(max(n_words, 1)):
+        f0 = rng.uniform(110, 220)
+        voiced = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 8))
+        burst = (0.6 * voiced / 2.6 + 0.05 * rng.standard_normal(word_n)) * envelope
+        pieces += [burst, np.zeros(gap_n)]
+    samples = np.concatenate(pieces) * 0.5
+    pcm = (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+    return AudioSegment(pcm.tobytes(), frame_rate=frame_rate, sample_width=2, channels=1)
+
+
+def make_background(path: str, seconds: int = 120, width: int = 1280, height: int = 720, fps: int = 30):
+    """A landscape test-pattern clip, so the render path still has to scale and crop it."""
+    from scripts.ffmpeg_render import get_ffmpeg_exe
+    subprocess.run([
+        get_ffmpeg_exe(), "-y", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={seconds}",
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", path
+    ], check=True)
+    return path
@@ -0,0 +1,226 @@
+# benchmarks/run_benchmarks.py
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+SCRIPT_LENGTHS = (4, 12, 24)
+STAGES = ["import_scripts", "generate_best_script", "generate_audio", "postprocess_audio_clips",
+          "build_captions", "syllable_chunked_captions", "assemble_video"]
+THIRD_PARTY_IMPORTS = ("openai", "pydub", "scipy.signal", "textstat", "moviepy")
+REGRESSION_TOLERANCE = 0.25  # flag stages more than 25% slower than the baseline
+# Settings that change what is measured; runs only compare against a baseline that matches
+COMPARABLE_SETTINGS = {"profile": "draft", "backend": "moviepy", "segments": 1,
+                       "llm_latency": 0.8, "tts_latency": 0.4, "error_rate": 0.0}
+
+
+@contextmanager
+def _timed(timings: dict, stage: str):
+    start = time.perf_counter()
+    yield
+    timings[stage] = round(time.perf_counter() - start, 3)
+
+
+def run_worker(n_lines: int, workdir: str, profile: str, backend: str, segments: int = 1) -> dict:
+    """
+    Runs every stage once for a synthetic n_lines script inside workdir.
+    Executed in a fresh process per script length, so module-level caches
+    (syllables, sprites, decoded images) start cold as in a real run.
+    """
+    timings = {}
+    # Imported here, after _stub_environment has pointed the API URLs at the stub
+    with _timed(timings, "import_scripts"):
+        from scripts import video_assembler
+        from scripts.script_generator import generate_best_script
+        from scripts.voice_generator import parse_script, generate_audio
+        from scripts.audio_postprocess import postprocess_audio_clips
+        from scripts.generate_captions_data import build_captions, syllable_chunked_captions
+    from benchmarks.fixtures import synthetic_script
+    # The scripts package defers these to first use; load them up front so
+    # stage timings measure the stage's work rather than one-off import cost
+    for module in THIRD_PARTY_IMPORTS:
+        importlib.import_module(module)
+
+    video_assembler.VIDEO_PATH = os.path.join(workdir, "background.mp4")
+    for name in ("FONT_PATH", "PETER_IMG_PATH", "STEWIE_IMG_PATH"):
+        setattr(video_assembler, name, os.path.join(REPO_ROOT, getattr(video_assembler, name)))
+
+    run_dir = os.path.join(workdir, f"lines_{n_lines}")
+    os.makedirs(run_dir, exist_ok=True)
+    script_path = os.path.join(run_dir, "script.txt")
+    raw_dir = os.path.join(run_dir, "AudioTemp")
+    processed_dir = os.path.join(run_dir, "ProcessedAudio")
+    captions_path = os.path.join(run_dir, "captions.json")
+
+    with _timed(timings, "generate_best_script"):
+        generate_best_script("benchmark topic", save_path=os.path.join(run_dir, "generated_script.txt"),
+                             with_metadata=True)
+    # TTS and later stages use a fixed-length script so timings scale with n_lines
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(synthetic_script(n_lines))
+    with _timed(timings, "generate_audio"):
+        generate_audio(parse_script(script_path), stitch_preview=False, audio_dir=raw_dir)
+    with _timed(timings, "postprocess_audio_clips"):
+        postprocess_audio_clips(raw_dir, processed_dir)
+    with _timed(timings, "build_captions"):
+        captions = build_captions(script_path, processed_dir)
+    with open(captions_path, "w", encoding="utf-8") as f:
+        json.dump(captions, f)
+    with _timed(timings, "syllable_chunked_captions"):
+        chunks = syllable_chunked_captions(captions)
+    with _timed(timings, "assemble_video"):
+        video_assembler.assemble_video("benchmark", captions_path=captions_path, output_dir=run_dir,
+                                       profile=profile, backend=backend, segments=segments)
+
+    timings["audio_seconds"] = round(captions[-1]["end"], 2)
+    timings["caption_chunks"] = len(chunks)
+    return timings
+
+
+def _stub_environment(base_url: str, workdir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "stub",
+        "OPENAI_BASE_URL": base_url + "/v1",
+        "ELEVENLABS_API_KEY": "stub",
+        "ELEVENLABS_API_URL": base_url + "/v1/text-to-speech/",
+        # Private caches so every run starts cold and never touches the real ones
+        "TTS_CACHE_DIR": os.path.join(workdir, "TTSCache"),
+        "METADATA_CACHE_DIR": os.path.join(workdir, "MetadataCache"),
+        "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    })
+    env.pop("ECONAI_TRACE", None)
+    return env
+
+
+def run_benchmarks(lengths=SCRIPT_LENGTHS, profile: str = "draft", backend: str = "moviepy",
+                   repeat: int = 1, llm_latency: float = 0.8, tts_latency: float = 0.4,
+                   error_rate: float = 0.0, segments: int = 1) -> dict:
+    """
+    Starts the stub services, builds the fixtures, and times each stage per
+    script length (best of `repeat` runs).
+    """
+    from benchmarks.fixtures import make_background
+    from benchmarks.stub_services import StubConfig, start_stub_server
+    from scripts.background_cache import prepare_background
+
+    config = StubConfig(llm_latency=llm_latency, tts_latency=tts_latency, error_rate=error_rate)
+    server, base_url = start_stub_server(config)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="econai_bench_") as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            # Synthetic lines average ~3.5s of speech; size the clip to the longest script
+            make_background(os.path.join(workdir, "background.mp4"), seconds=4 * max(lengths) + 15)
+            # One-time background preparation is excluded, as it is in production
+            prepare_background(os.path.join(workdir, "background.mp4"))
+            env = _stub_environment(base_url, workdir)
+            for n_lines in lengths:
+                runs = []
+                for _ in range(repeat):
+                    for cache in ("TTSCache", "MetadataCache"):
+                        shutil.rmtree(os.path.join(workdir, cache), ignore_errors=True)
+                    out = subprocess.run(
+                        [sys.executable, "-m", "benchmarks.run_benchmarks", "--worker", str(n_lines),
+                         "--workdir", workdir, "--profile", profile, "--backend", backend,
+                         "--segments", str(segments)],
+                        env=env, cwd=workdir, capture_output=True, text=True
+                    )
+                    if out.returncode != 0:
+                        raise RuntimeError(f"Benchmark worker failed for {n_lines} lines:\n{out.stderr[-4000:]}")
+                    runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+                results[str(n_lines)] = {key: min(run[key] for run in runs) for key in runs[0]}
+                print(f"[BENCH] {n_lines:>3} lines: " + ", ".join(f"{s} {results[str(n_lines)][s]:.2f}s" for s in STAGES))
+        finally:
+            os.chdir(cwd)
+            server.shutdown()
+
+    return {
+        "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                    "cpu_count": os.cpu_count()},
+        "settings": {"profile": profile, "backend": backend, "repeat": repeat, "llm_latency": llm_latency,
+                     "tts_latency": tts_latency, "error_rate": error_rate, "segments": segments},
+        "results": results
+    }
+
+
+def settings_mismatch(report: dict, baseline: dict) -> dict:
+    """{setting: (baseline, run)} for COMPARABLE_SETTINGS that differ; absent ones take the default."""
+    mismatch = {}
+    for name, default in COMPARABLE_SETTINGS.items():
+        before = baseline.get("settings", {}).get(name, default)
+        after = report.get("settings", {}).get(name, default)
+        if before != after:
+            mismatch[name] = (before, after)
+    return mismatch
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float = REGRESSION_TOLERANCE) -> list:
+    """
+    Prints per-stage deltas and returns the (lines, stage) pairs that
+    regressed. Returns None, comparing nothing, when the run's settings
+    differ from the baseline's.
+    """
+    mismatch = settings_mismatch(report, baseline)
+    if mismatch:
+        details = ", ".join(f"{name} {before} ➝ {after}" for name, (before, after) in mismatch.items())
+        print(f"[BENCH] Settings differ from the baseline ({details}); skipping the comparison")
+        return None
+    regressions = []
+    for n_lines, timings in report["results"].items():
+        base = baseline.get("results", {}).get(n_lines)
+        if not base:
+            continue
+        for stage in STAGES:
+            if stage not in base or stage not in timings:
+                continue
+            before, after = base[stage], timings[stage]
+            change = (after - before) / before if before > 0 else 0.0
+            flag = ""
+            if change > tolerance and after - before > 0.05:
+                flag = "  ⚠️ REGRESSION"
+                regressions.append((n_lines, stage))
+            print(f"[BENCH] {n_lines:>3} lines {stage:<26} {before:8.2f}s ➝ {after:8.2f}s ({change:+.0%}){flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks against local API stubs.")
+    parser.add_argument("--lengths", type=int, nargs="+", default=list(SCRIPT_LENGTHS), help="script lengths (lines)")
+    parser.add_argument("--profile", default="draft")
+    parser.add_argument("--backend", choices=["moviepy", "ffmpeg"], default="moviepy")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--tts-latency", type=float, default=0.4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--segments", type=int, default=1, help="parallel render segments")
+    parser.add_argument("--save-baseline", action="store_true", help=f"overwrite {os.path.relpath(BASELINE_PATH, REPO_ROOT)}")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.workdir, args.profile, args.backend, args.segments)))
+        sys.exit(0)
+
+    report = run_benchmarks(args.lengths, args.profile, args.backend, args.repeat,
+                            args.llm_latency, args.tts_latency, args.error_rate, args.segments)
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[BENCH] Baseline saved to {BASELINE_PATH}")
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(report, json.load(f))
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,173 @@
+# benchmarks/stub_services.py
+
+import base64
+import io
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from benchmarks.fixtures import synthetic_speech, synthetic_script
+
+
+class StubConfig:
+    """
+    Behaviour of the local stand-ins. latency is seconds per request (plus up
+    to `jitter`); error_rate is the fraction of requests answered with a
+    retryable 429/500 instead of a result.
+    """
+
+    def __init__(self, llm_latency=0.8, tts_latency=0.4, jitter=0.1, error_rate=0.0,
+                 script_lines=12, seed=0):
+        self.llm_latency = llm_latency
+        self.tts_latency = tts_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.script_lines = script_lines
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = {"llm": 0, "tts": 0, "errors": 0}
+
+
+def _encode_mp3(segment) -> bytes:
+    buf = io.BytesIO()
+    segment.export(buf, format="mp3")
+    return buf.getvalue()
+
+
+def _alignment(text: str, duration_s: float) -> dict:
+    # Characters evenly spread over the clip, matching synthetic_speech's word layout
+    step = duration_s / max(len(text), 1)
+    return {
+        "characters": list(text),
+        "character_start_times_seconds": [round(i * step, 3) for i in range(len(text))],
+        "character_end_times_seconds": [round((i + 1) * step, 3) for i in range(len(text))]
+    }
+
+
+def _fill_schema(schema: dict, count_hint: int = 1):
+    """Smallest value that satisfies a JSON schema, for structured-output requests."""
+    kind = schema.get("type")
+    if "enum" in schema:
+        return schema["enum"][0]
+    if kind == "object":
+        return {key: _fill_schema(sub) for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return ["#benchmark"] * count_hint
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.0
+    if kind == "boolean":
+        return True
+    return "benchmark"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    config: StubConfig = None
+    _mp3_cache = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, body: bytes, duration: float, chunk: int = 8192):
+        """Sends body in chunks spread over `duration`, like a streaming TTS response."""
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        pieces = range(0, len(body), chunk)
+        for offset in pieces:
+            self.wfile.write(body[offset:offset + chunk])
+            self.wfile.flush()
+            time.sleep(duration / max(len(pieces), 1))
+
+    def _delay_or_fail(self, latency: float) -> bool:
+        config = self.config
+        with config.lock:
+            wait = latency + config.random.uniform(0, config.jitter)
+            fail = config.random.random() < config.error_rate
+            if fail:
+                config.requests["errors"] += 1
+        time.sleep(wait)
+        if fail:
+            if config.random.random() < 0.5:
+                self._send(429, b'{"error": "rate limited"}', headers={"Retry-After": "0.2"})
+            else:
+                self._send(500, b'{"error": "stub failure"}')
+        return fail
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/chat/completions"):
+            self._chat(payload)
+        elif "/text-to-speech/" in self.path:
+            self._tts(payload)
+        else:
+            self._send(404, b'{"error": "unknown endpoint"}')
+
+    def _chat(self, payload: dict):
+        with self.config.lock:
+            self.config.requests["llm"] += 1
+        if self._delay_or_fail(self.config.llm_latency):
+            return
+        response_format = payload.get("response_format")
+        if response_format and response_format.get("type") == "json_schema":
+            content = json.dumps(_fill_schema(response_format["json_schema"]["schema"]))
+        else:
+            content = synthetic_script(self.config.script_lines, seed=int(payload.get("temperature", 0) * 100))
+        body = {
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+            "model": payload.get("model", "stub"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content, "refusal": None}}],
+            "usage": {"prompt_tokens": sum(len(m["content"]) // 4 for m in payload.get("messages", [])),
+                      "completion_tokens": len(content) // 4,
+                      "total_tokens": 0}
+        }
+        self._send(200, json.dumps(body).encode("utf-8"))
+
+    def _tts(self, payload: dict):
+        with self.config.lock:
+            self.config.requests["tts"] += 1
+        stream = self.path.endswith("/stream")
+        # A streaming reply starts after a fraction of the latency and trickles in over the rest
+        if self._delay_or_fail(self.config.tts_latency * (0.3 if stream else 1.0)):
+            return
+        text = payload.get("text", "")
+        words = len(re.findall(r"\S+", text))
+        if words not in self._mp3_cache:
+            speech = synthetic_speech(words)
+            self._mp3_cache[words] = (_encode_mp3(speech), speech.duration_seconds)
+        audio, duration = self._mp3_cache[words]
+
+        if stream:
+            self._send_stream(audio, self.config.tts_latency * 0.7)
+        elif self.path.endswith("/with-timestamps"):
+            body = {"audio_base64": base64.b64encode(audio).decode("ascii"),
+                    "alignment": _alignment(text, duration)}
+            self._send(200, json.dumps(body).encode("utf-8"))
+        else:
+            self._send(200, audio, content_type="audio/mpeg")
+
+
+def start_stub_server(config: StubConfig = None, port: int = 0):
+    """
+    Starts the OpenAI + ElevenLabs stand-in on 127.0.0.1 in a daemon thread.
+    Returns (server, base_url); point OPENAI_BASE_URL at base_url + "/v1" and
+    ELEVENLABS_API_URL at base_url + "/v1/text-to-speech/".
+    """
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config or StubConfig(), "_mp3_cache": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
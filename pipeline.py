@@ -1,18 +1,41 @@
-from scripts.script_generator import generate_best_script
-from scripts.voice_generator import parse_script, generate_audio
-from scripts.audio_postprocess import postprocess_audio_clips
-from scripts.generate_captions_data import generate_and_save_captions
-from scripts.video_assembler import assemble_video
-from scripts.Metadata_generator import save_metadata_for_script
+import argparse
+from scripts.render_profiles import RENDER_PROFILES, DEFAULT_PROFILE
+from scripts.stage_cache import StageCache
+from scripts.stages import STAGES, TopicPaths, topic_stages
+from scripts.tracing import add_trace_arguments, start_trace_from_args, finish_trace_from_args
+
+def run_pipeline(topic: str, profile: str = DEFAULT_PROFILE, cache: StageCache = None, stream: bool = False,
+                 segments: int = 1):
+    """
+    Runs every stage for one topic. Each stage declares its inputs (including
+    the code it runs), outputs and parameters, so a re-run only repeats the
+    stages whose inputs changed. stream=True replaces tts/postprocess/captions
+    with one "speech" stage that streams each line from TTS through DSP into
+    the captions as soon as it arrives. segments > 1 renders that many
+    timeline segments in parallel processes.
+    """
+    paths = TopicPaths.single()
+    cache = cache or StageCache(paths.stage_manifest)
+    for stage in topic_stages(topic, paths, stream=stream, render_kwargs={"profile": profile, "segments": segments}):
+        cache.run(stage.name, lambda: stage.fn(*stage.args, **stage.kwargs), inputs=stage.inputs,
+                  outputs=stage.outputs, params=stage.params, result_outputs=stage.result_outputs)
 
 if __name__ == "__main__":
-    topic = "Why are payday loans so bad?"
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--topic", default="Why are payday loans so bad?")
+    parser.add_argument("--profile", choices=list(RENDER_PROFILES), default=DEFAULT_PROFILE,
+                        help="render profile: draft for quick caption review, final for upload")
+    parser.add_argument("--force", nargs="+", choices=STAGES + ["all"], default=[],
+                        help="re-run these stages even if their inputs are unchanged")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream each line from TTS through DSP into the captions as it arrives")
+    parser.add_argument("--segments", type=int, default=1,
+                        help="render this many timeline segments in parallel processes")
+    add_trace_arguments(parser)
+    args = parser.parse_args()
 
-    # Step 1: Generate and save best script
-    #best_script = generate_best_script(topic, save_path="script.txt")
-    #script_lines = parse_script("script.txt")
-    #generate_audio(script_lines)
-    #postprocess_audio_clips("assets/AudioTemp", "ProcessedAudio")
-    #generate_and_save_captions("script.txt", "ProcessedAudio", "captions.json")
-    assemble_video(topic)
-    save_metadata_for_script("script.txt")
\ No newline at end of file
+    start_trace_from_args(args)
+    force = STAGES if "all" in args.force else args.force
+    run_pipeline(args.topic, profile=args.profile, cache=StageCache(force=force), stream=args.stream,
+                 segments=args.segments)
+    finish_trace_from_args(args)
@@ -2,12 +2,44 @@ import os
 import json
 import re
 import csv
+import hashlib
 from datetime import datetime
-from openai import OpenAI
-from dotenv import load_dotenv
-
-load_dotenv()
-client = OpenAI()
+from concurrent.futures import ThreadPoolExecutor
+from scripts.file_utils import atomic_write_json
+from scripts.clients import get_openai_client, openai_retryable_errors
+from scripts.retry import call_with_retries
+from scripts.tracing import span, counter, llm_usage
+
+METADATA_MODEL = "gpt-4.1"
+METADATA_TEMPERATURE = 0.7
+# Request limits for schedule runs (override via env)
+METADATA_CONCURRENCY = int(os.getenv("METADATA_CONCURRENCY", "8"))
+METADATA_TIMEOUT = float(os.getenv("METADATA_TIMEOUT", "60"))
+METADATA_RETRIES = 4
+METADATA_CACHE_DIR = os.getenv("METADATA_CACHE_DIR", "assets/MetadataCache")
+
+METADATA_GUIDELINES = (
+    "generate a viral-ready video title, a punchy caption (under 200 characters), "
+    "and a list of 6–8 hashtags optimized for TikTok, YouTube Shorts, Instagram Reels, and X.\n\n"
+    "The caption should be clear, funny, or curiosity-driven, using natural human tone.\n"
+    "Hashtags must start with '#' and be lowercase, space-free, and relevant to the script.\n"
+)
+
+# Structured output: the API constrains the reply to this shape, so no JSON repair is needed
+METADATA_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "caption": {"type": "string"},
+        "hashtags": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["title", "caption", "hashtags"],
+    "additionalProperties": False
+}
+METADATA_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "post_metadata", "strict": True, "schema": METADATA_SCHEMA}
+}
 
 def build_metadata_prompt_from_script(script_text: str):
     return [
@@ -15,10 +47,7 @@ def build_metadata_prompt_from_script(script_text: str):
             "role": "system",
             "content": (
                 "You are a short-form content strategist. Based on the script below, "
-                "generate a viral-ready video title, a punchy caption (under 200 characters), "
-                "and a list of 6–8 hashtags optimized for TikTok, YouTube Shorts, Instagram Reels, and X.\n\n"
-                "The caption should be clear, funny, or curiosity-driven, using natural human tone.\n"
-                "Hashtags must start with '#' and be lowercase, space-free, and relevant to the script.\n"
+                + METADATA_GUIDELINES +
                 "Return only a JSON object with keys: 'title', 'caption', and 'hashtags'."
             )
         },
@@ -35,88 +64,144 @@ def load_script_text(script_path: str) -> str:
     with open(script_path, "r", encoding="utf-8") as f:
         return f.read().strip()
 
-def extract_json_like(text):
-    match = re.search(r"\{.*\}", text, re.DOTALL)
-    return match.group(0) if match else text
+def metadata_cache_key(messages) -> str:
+    # The prompt is part of the key, so prompt edits don't serve stale metadata
+    payload = json.dumps([METADATA_MODEL, METADATA_TEMPERATURE, METADATA_SCHEMA, messages], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
-def generate_post_metadata_from_script(script_path: str):
+def load_cached_metadata(key: str):
+    try:
+        with open(os.path.join(METADATA_CACHE_DIR, key + ".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def store_cached_metadata(key: str, metadata: dict):
+    os.makedirs(METADATA_CACHE_DIR, exist_ok=True)
+    atomic_write_json(os.path.join(METADATA_CACHE_DIR, key + ".json"), metadata, indent=2, ensure_ascii=False)
+
+def generate_post_metadata_from_script(script_path: str, use_cache: bool = True):
+    """
+    Generates title/caption/hashtags for a script. Successful results are
+    cached by script content (and prompt), so unchanged scripts aren't re-billed.
+    """
     script_text = load_script_text(script_path)
     messages = build_metadata_prompt_from_script(script_text)
-
-    response = client.chat.completions.create(
-        model="gpt-4.1",
-        messages=messages,
-        temperature=0.7,
-        max_tokens=400
-    )
-
-    raw = response.choices[0].message.content.strip()
-
-    if raw.startswith("```json") or raw.startswith("```"):
-        raw = raw.strip("`").strip("json").strip()
-
+    key = metadata_cache_key(messages)
+    if use_cache:
+        cached = load_cached_metadata(key)
+        if cached is not None:
+            print(f"♻️ Metadata cache hit: {script_path}")
+            counter("metadata_cache", hit=1)
+            return cached
+        counter("metadata_cache", hit=0)
+
+    request_client = get_openai_client().with_options(timeout=METADATA_TIMEOUT, max_retries=0)
+    with span("llm.metadata", "api") as trace:
+        response = call_with_retries(
+            request_client.chat.completions.create,
+            model=METADATA_MODEL,
+            messages=messages,
+            temperature=METADATA_TEMPERATURE,
+            max_tokens=400,
+            response_format=METADATA_RESPONSE_FORMAT,
+            retries=METADATA_RETRIES,
+            retry_on=openai_retryable_errors()
+        )
+        trace.update(llm_usage(response))
+
+    message = response.choices[0].message
     try:
-        metadata = json.loads(raw)
+        # Only a refusal or a truncated reply can break the schema
+        if getattr(message, "refusal", None):
+            raise ValueError(f"refused: {message.refusal}")
+        metadata = json.loads(message.content)
     except Exception as e:
-        print(f"\n❌ JSON parse error: {e}")
-        print("🔍 Attempting fallback JSON extraction...")
-        try:
-            fallback = extract_json_like(raw)
-            metadata = json.loads(fallback)
-        except Exception as e2:
-            print(f"\n🧨 Fallback parse failed: {e2}")
-            print("Raw output:\n", raw)
-            metadata = {
-                "title": f"[Error parsing title] {e2}",
-                "caption": "[Failed to parse caption]",
-                "hashtags": []
-            }
+        print(f"\n❌ Metadata response unusable: {e}")
+        print("Raw output:\n", message.content)
+        return {
+            "title": f"[Error parsing title] {e}",
+            "caption": "[Failed to parse caption]",
+            "hashtags": []
+        }
 
+    if use_cache:
+        store_cached_metadata(key, metadata)
     return metadata
 
 def sanitize_filename(text: str) -> str:
     return re.sub(r"[^a-zA-Z0-9_\-]", "_", text.strip().lower())[:50]
 
-def process_schedule(schedule_path: str):
+POSTING_FIELDS = ["Topic", "Date", "Time", "Title", "Caption", "Hashtags", "Metadata File"]
+
+def load_schedule(schedule_path: str):
+    """Returns [(topic, date, time), ...] from the tab-separated schedule."""
     with open(schedule_path, "r", encoding="utf-8") as f:
-        lines = [line.strip().split("\t") for line in f if line.strip()]
+        return [tuple(line.strip().split("\t")) for line in f if line.strip()]
+
+def posting_row(topic, date, time, metadata, metadata_filename):
+    return {
+        "Topic": topic,
+        "Date": date,
+        "Time": time,
+        "Title": metadata.get("title", ""),
+        "Caption": metadata.get("caption", ""),
+        "Hashtags": " ".join(metadata.get("hashtags", [])),
+        "Metadata File": metadata_filename
+    }
+
+def process_schedule(schedule_path: str, max_workers: int = METADATA_CONCURRENCY):
+    """
+    Generates metadata for every scheduled topic, up to max_workers requests
+    in flight, then writes posting_schedule.csv in schedule order.
+    """
+    lines = load_schedule(schedule_path)
 
     os.makedirs("metadata", exist_ok=True)
     os.makedirs("final_output", exist_ok=True)
 
+    jobs = []
+    for topic, date, time in lines:
+        script_path = f"scripts/{sanitize_filename(topic)}.txt"
+        if not os.path.exists(script_path):
+            print(f"⚠️ Script file not found: {script_path}")
+            continue
+        jobs.append((topic, date, time, script_path))
+
+    def generate(job):
+        try:
+            return generate_post_metadata_from_script(job[3])
+        except Exception as e:
+            print(f"❌ Metadata failed for {job[0]}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as pool:
+        results = list(pool.map(generate, jobs))
+
     with open("final_output/posting_schedule.csv", "w", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=["Topic", "Date", "Time", "Title", "Caption", "Hashtags", "Metadata File"])
+        writer = csv.DictWriter(csvfile, fieldnames=POSTING_FIELDS)
         writer.writeheader()
 
-        for topic, date, time in lines:
-            script_path = f"scripts/{sanitize_filename(topic)}.txt"
-            if not os.path.exists(script_path):
-                print(f"⚠️ Script file not found: {script_path}")
+        for (topic, date, time, _), metadata in zip(jobs, results):
+            if metadata is None:
                 continue
-
-            metadata = generate_post_metadata_from_script(script_path)
             metadata_filename = sanitize_filename(metadata.get("title", topic)) + ".json"
             metadata_path = os.path.join("metadata", metadata_filename)
 
             with open(metadata_path, "w", encoding="utf-8") as f:
                 json.dump(metadata, f, indent=2, ensure_ascii=False)
 
-            writer.writerow({
-                "Topic": topic,
-                "Date": date,
-                "Time": time,
-                "Title": metadata.get("title", ""),
-                "Caption": metadata.get("caption", ""),
-                "Hashtags": " ".join(metadata.get("hashtags", [])),
-                "Metadata File": metadata_filename
-            })
+            writer.writerow(posting_row(topic, date, time, metadata, metadata_filename))
             print(f"✅ Processed: {topic}")
 
+def metadata_path(metadata: dict, metadata_dir="metadata") -> str:
+    """Where save_metadata_for_script writes a post's metadata (named after its title)."""
+    return os.path.join(metadata_dir, sanitize_filename(metadata.get("title", "untitled")) + ".json")
+
 def save_metadata_for_script(script_path: str, metadata_dir="metadata"):
     metadata = generate_post_metadata_from_script(script_path)
-    os.makedirs(metadata, exist_ok=True)
-    filename = sanitize_filename(metadata.get("title", "untitled")) + ".json"
-    out_path = os.path.join(metadata_dir, filename)
+    os.makedirs(metadata_dir, exist_ok=True)
+    out_path = metadata_path(metadata, metadata_dir)
 
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(metadata, f, indent=2, ensure_ascii=False)
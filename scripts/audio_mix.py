@@ -0,0 +1,145 @@
+# scripts/audio_mix.py
+
+import json
+import os
+import tempfile
+import wave
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scripts.dsp import segment_to_array, db_to_gain
+from scripts.generate_captions_data import LINE_GAP_S
+from scripts.tracing import span
+
+# Background music bed, mixed under the dialogue with sidechain ducking
+MUSIC_PATH = None             # e.g. "assets/music/bed.mp3"; None renders dialogue only
+MUSIC_GAIN_DB = -18.0         # bed level relative to the file, while nobody speaks
+DUCK_DB = -12.0               # extra attenuation while a line is playing
+DUCK_THRESHOLD_DB = -45.0     # dialogue level (dBFS) that counts as speech
+DUCK_RAMP_MS = 120            # fade into / out of the duck
+DUCK_HOLD_MS = 350            # stay ducked through short pauses between words
+ENVELOPE_HOP_MS = 10
+DECODE_WORKERS = 8
+
+
+def mix_params():
+    """Settings that change the soundtrack, for the stage cache key."""
+    return {"music_path": MUSIC_PATH, "music_gain_db": MUSIC_GAIN_DB, "duck_db": DUCK_DB,
+            "duck_threshold_db": DUCK_THRESHOLD_DB, "duck_ramp_ms": DUCK_RAMP_MS,
+            "duck_hold_ms": DUCK_HOLD_MS, "line_gap_s": LINE_GAP_S}
+
+
+def mix_inputs():
+    """Asset files read by mix_soundtrack, besides the dialogue clips."""
+    return [MUSIC_PATH] if MUSIC_PATH else []
+
+
+def _load_pcm(path: str, frame_rate: int = None, channels: int = None):
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(path).set_sample_width(2)
+    if frame_rate:
+        audio = audio.set_frame_rate(frame_rate).set_channels(channels)
+    return segment_to_array(audio), audio.frame_rate
+
+
+def build_dialogue_track(audio_paths: list[str], gap_s: float = LINE_GAP_S):
+    """
+    Decodes every line once and lays them end to end, gap_s of silence apart
+    (the same spacing the captions use), in one preallocated 16-bit-range
+    float array shaped (frames, channels). Returns (samples, frame_rate).
+    """
+    first, frame_rate = _load_pcm(audio_paths[0])
+    channels = first.shape[1]
+    with ThreadPoolExecutor(max_workers=DECODE_WORKERS) as pool:
+        rest = list(pool.map(lambda path: _load_pcm(path, frame_rate, channels)[0], audio_paths[1:]))
+    clips = [first] + rest
+
+    gap = int(round(gap_s * frame_rate))
+    track = np.zeros((sum(len(clip) for clip in clips) + gap * (len(clips) - 1), channels))
+    cursor = 0
+    for clip in clips:
+        track[cursor:cursor + len(clip)] = clip
+        cursor += len(clip) + gap
+    return track, frame_rate
+
+
+def ducking_gain(dialogue: np.ndarray, frame_rate: int, duck_db: float = DUCK_DB,
+                 threshold_db: float = DUCK_THRESHOLD_DB, ramp_ms: float = DUCK_RAMP_MS,
+                 hold_ms: float = DUCK_HOLD_MS, hop_ms: float = ENVELOPE_HOP_MS) -> np.ndarray:
+    """
+    Per-sample linear gain for the music bed: duck_db wherever the dialogue's
+    RMS envelope is above threshold_db, held through short pauses and
+    smoothed into ramp_ms fades (centered, so the duck starts just ahead of
+    each line). Computed per hop and interpolated, with no per-sample loop.
+    """
+    hop = max(1, int(frame_rate * hop_ms / 1000))
+    n_hops = -(-len(dialogue) // hop)
+    mono = np.zeros(n_hops * hop)
+    mono[:len(dialogue)] = dialogue.mean(axis=1)
+    rms = np.sqrt(np.mean(mono.reshape(n_hops, hop) ** 2, axis=1))
+    speech = 20 * np.log10(np.maximum(rms, 1e-9) / 32768.0) > threshold_db
+
+    hold = int(hold_ms / hop_ms)
+    if hold:
+        speech = np.convolve(speech, np.ones(hold + 1), mode="full")[:n_hops] > 0
+    ramp = max(1, int(ramp_ms / hop_ms))
+    gain_db = np.convolve(np.where(speech, duck_db, 0.0), np.ones(ramp) / ramp, mode="same")
+
+    hop_centers = (np.arange(n_hops) + 0.5) * hop
+    return db_to_gain(np.interp(np.arange(len(dialogue)), hop_centers, gain_db))
+
+
+def mix_music(dialogue: np.ndarray, frame_rate: int, music_path: str,
+              music_gain_db: float = MUSIC_GAIN_DB, **duck_kwargs) -> np.ndarray:
+    """Loops/trims the music to the dialogue's length and adds it under the dialogue, ducked."""
+    music, _ = _load_pcm(music_path, frame_rate, dialogue.shape[1])
+    music = music[np.arange(len(dialogue)) % len(music)]
+    gain = ducking_gain(dialogue, frame_rate, **duck_kwargs) * db_to_gain(music_gain_db)
+    return dialogue + music * gain[:, None]
+
+
+def write_wav(path: str, samples: np.ndarray, frame_rate: int):
+    pcm = np.clip(np.round(samples), -32768, 32767).astype("<i2")
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(frame_rate)
+        wav.writeframes(pcm.tobytes())
+
+
+def mix_soundtrack(captions_path: str, output_path: str, music_path: str = None,
+                   gap_s: float = LINE_GAP_S) -> str:
+    """
+    Writes the full soundtrack for a captions.json as one WAV: every line's
+    processed clip in order, plus the ducked music bed (music_path, else
+    MUSIC_PATH) if one is set. The renderers read this single file instead
+    of one stream per line.
+    """
+    music_path = music_path or MUSIC_PATH
+    with open(captions_path, "r", encoding="utf-8") as f:
+        captions = json.load(f)
+    with span("audio.mix", "stage", lines=len(captions), music=bool(music_path)):
+        track, frame_rate = build_dialogue_track([cap["audio_path"] for cap in captions], gap_s)
+        if music_path:
+            track = mix_music(track, frame_rate, music_path)
+        write_wav(output_path, track, frame_rate)
+    print(f"🎚️ Soundtrack mixed ➝ {output_path} ({len(track) / frame_rate:.2f}s)")
+    return output_path
+
+
+@contextmanager
+def premixed_soundtrack(captions_path: str, output_dir: str, soundtrack: str = None):
+    """
+    Yields soundtrack if the caller already has one; otherwise mixes a
+    temporary WAV in output_dir and deletes it once the render is done.
+    """
+    if soundtrack is not None:
+        yield soundtrack
+        return
+    fd, path = tempfile.mkstemp(prefix="soundtrack_", suffix=".wav", dir=output_dir)
+    os.close(fd)
+    try:
+        yield mix_soundtrack(captions_path, path)
+    finally:
+        os.remove(path)
@@ -1,10 +1,19 @@
 # scripts/audio_postprocess.py
 
 import os
-from pydub import AudioSegment
-from pydub.effects import normalize, compress_dynamic_range
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+from scripts.dsp import process_segment
+from scripts.audio_probe import write_duration_manifest
+from scripts.caption_alignment import alignment_sidecar_path
+from scripts.tracing import span
 
-def process_stewie(audio: AudioSegment) -> AudioSegment:
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+
+def process_stewie(audio: "AudioSegment") -> "AudioSegment":
+    from pydub.effects import compress_dynamic_range
     eq_boosted = (
         audio
         .high_pass_filter(140)
@@ -22,7 +31,8 @@ def process_stewie(audio: AudioSegment) -> AudioSegment:
     enhanced = compressed.overlay(nasal)
     return enhanced
 
-def process_peter(audio: AudioSegment) -> AudioSegment:
+def process_peter(audio: "AudioSegment") -> "AudioSegment":
+    from pydub.effects import compress_dynamic_range
     processed = (
         audio
         .low_pass_filter(2800)
@@ -39,29 +49,74 @@ def process_peter(audio: AudioSegment) -> AudioSegment:
         release=300
     )
 
-def normalize_group(clips: list[AudioSegment], target_dBFS: float = -16.0):
-    loudnesses = [clip.dBFS for clip in clips]
-    gains = [target_dBFS - dbfs for dbfs in loudnesses]
-    return [clip.apply_gain(gain) for clip, gain in zip(clips, gains)]
+def _process_clip(path: str, out_path: str, speaker: str, engine: str,
+                  target_dBFS: float, output_format: str):
+    """
+    Worker for postprocess_audio_clips: decode, process, normalize and export a
+    single clip. The loudness gain depends only on the clip itself, so each
+    clip is normalized on its own, without holding the speaker's whole group.
+    """
+    from pydub import AudioSegment
 
-def postprocess_audio_clips(input_dir="AudioTemp", output_dir="ProcessedAudio"):
-    os.makedirs(output_dir, exist_ok=True)
-    speaker_clips = {"peter": [], "stewie": []}
-    speaker_filenames = {"peter": [], "stewie": []}
+    with span("postprocess.clip", "item", clip=os.path.basename(path), engine=engine) as trace:
+        audio = AudioSegment.from_file(path)
+        if engine == "numpy":
+            processed = process_segment(audio, speaker)
+        else:
+            processed = process_stewie(audio) if speaker == "stewie" else process_peter(audio)
+        loudness = processed.dBFS
+        if loudness != float("-inf"):
+            processed = processed.apply_gain(target_dBFS - loudness)
+        processed.export(out_path, format=output_format)
+        trace["audio_ms"] = len(processed)
+    return loudness, len(processed)
+
+def postprocess_audio_clips(input_dir="AudioTemp", output_dir="ProcessedAudio", engine="numpy",
+                            workers=None, output_format="mp3", target_dBFS=-16.0):
+    """
+    Applies each speaker's voice chain and per-speaker loudness normalization.
+    engine="numpy" runs the vectorized chains in scripts/dsp.py; engine="pydub"
+    runs the original reference chains above.
 
+    Clips are processed across a pool of `workers` processes (default: all
+    cores; 1 runs inline). output_format="wav" writes lossless intermediates
+    instead of re-encoding to MP3.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = []
     for filename in sorted(os.listdir(input_dir)):
         if not filename.endswith(".mp3"):
             continue
         speaker = "stewie" if "stewie" in filename.lower() else "peter"
-        path = os.path.join(input_dir, filename)
-        audio = AudioSegment.from_file(path)
-        processed = process_stewie(audio) if speaker == "stewie" else process_peter(audio)
-        speaker_clips[speaker].append(processed)
-        speaker_filenames[speaker].append(filename)
+        out_name = os.path.splitext(filename)[0] + "." + output_format
+        # Drop an output from a previous run in the other format so lookups stay unambiguous
+        for ext in (".mp3", ".wav"):
+            stale = os.path.join(output_dir, os.path.splitext(filename)[0] + ext)
+            if ext != "." + output_format and os.path.exists(stale):
+                os.remove(stale)
+        jobs.append((os.path.join(input_dir, filename), os.path.join(output_dir, out_name), speaker))
+
+        # Processing doesn't shift timing, so TTS character timestamps still apply
+        sidecar = alignment_sidecar_path(os.path.join(input_dir, filename))
+        if os.path.exists(sidecar):
+            shutil.copyfile(sidecar, alignment_sidecar_path(os.path.join(output_dir, out_name)))
+
+    if not jobs:
+        return
+    paths, out_paths, speakers = zip(*jobs)
+    n = len(jobs)
+    args = (paths, out_paths, speakers, [engine] * n, [target_dBFS] * n, [output_format] * n)
 
-    for speaker in ["peter", "stewie"]:
-        normalized = normalize_group(speaker_clips[speaker])
-        for clip, fname in zip(normalized, speaker_filenames[speaker]):
-            out_path = os.path.join(output_dir, fname)
-            clip.export(out_path, format="mp3")
-            print(f"✅ Exported normalized {fname} ➝ {out_path}")
+    workers = min(workers or os.cpu_count() or 1, n)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    durations = {}
+    try:
+        results = pool.map(_process_clip, *args) if pool else map(_process_clip, *args)
+        for out_path, (_, duration_ms) in zip(out_paths, results):
+            durations[os.path.basename(out_path)] = duration_ms / 1000.0
+            print(f"✅ Exported normalized {os.path.basename(out_path)} ➝ {out_path}")
+    finally:
+        if pool:
+            pool.shutdown()
+        if durations:
+            write_duration_manifest(output_dir, durations)
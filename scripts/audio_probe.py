@@ -0,0 +1,184 @@
+# scripts/audio_probe.py
+
+import json
+import os
+import struct
+import wave
+from scripts.file_utils import file_signature, atomic_write_json
+
+DURATION_MANIFEST = "durations.json"
+
+# MPEG audio header tables, indexed [version][layer]
+_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 2.5: [11025, 12000, 8000]}
+
+
+def _parse_frame_header(header: bytes):
+    """
+    Returns (version, layer, sample_rate, samples_per_frame, frame_length, mono)
+    for a 4-byte MPEG audio frame header, or None if it isn't one.
+    """
+    b1, b2, b3, b4 = header
+    if b1 != 0xFF or (b2 & 0xE0) != 0xE0:
+        return None
+    version = {0: 2.5, 2: 2, 3: 1}.get((b2 >> 3) & 0x3)
+    layer = {1: 3, 2: 2, 3: 1}.get((b2 >> 1) & 0x3)
+    bitrate_index = (b3 >> 4) & 0xF
+    rate_index = (b3 >> 2) & 0x3
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+
+    bitrate = _BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    padding = (b3 >> 1) & 0x1
+    mono = ((b4 >> 6) & 0x3) == 3
+
+    if layer == 1:
+        samples = 384
+        length = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and version != 1:
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+    else:
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    return version, layer, sample_rate, samples, length, mono
+
+
+def _skip_id3v2(data: bytes) -> int:
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = 0
+    for b in data[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def mp3_duration(path: str):
+    """
+    Reads an MP3's duration from its frame headers without decoding PCM.
+    Uses the Xing/Info (or VBRI) frame count when present, otherwise walks
+    every frame header. Returns None if the stream can't be parsed reliably.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    start = pos = _skip_id3v2(data)
+    end = len(data)
+    if data[end - 128:end - 125] == b"TAG":
+        end -= 128
+
+    # Find the first valid frame (tolerate a little junk before it)
+    first = None
+    while pos + 4 <= end and first is None:
+        first = _parse_frame_header(data[pos:pos + 4])
+        if first is None:
+            pos += 1
+            if pos > start + 4096:
+                return None
+    if first is None:
+        return None
+
+    version, layer, sample_rate, samples, length, mono = first
+
+    # Xing/Info header inside the first frame
+    if layer == 3:
+        side_info = (17 if mono else 32) if version == 1 else (9 if mono else 17)
+        tag_pos = pos + 4 + side_info
+        if data[tag_pos:tag_pos + 4] in (b"Xing", b"Info"):
+            flags = struct.unpack(">I", data[tag_pos + 4:tag_pos + 8])[0]
+            if flags & 0x1:
+                frames = struct.unpack(">I", data[tag_pos + 8:tag_pos + 12])[0]
+                if frames:
+                    total = frames * samples
+                    # LAME tag: encoder delay/padding, which ffmpeg trims on decode
+                    offset = tag_pos + 8
+                    for bit in (0x1, 0x2, 0x4, 0x8):
+                        if flags & bit:
+                            offset += {0x1: 4, 0x2: 4, 0x4: 100, 0x8: 4}[bit]
+                    lame = offset + 21
+                    if data[offset:offset + 4] in (b"LAME", b"Lavc", b"Lavf") and lame + 3 <= len(data):
+                        d = data[lame:lame + 3]
+                        delay = (d[0] << 4) | (d[1] >> 4)
+                        pad = ((d[1] & 0x0F) << 8) | d[2]
+                        total -= delay + pad
+                    return max(total, 0) / sample_rate
+        vbri_pos = pos + 4 + 32
+        if data[vbri_pos:vbri_pos + 4] == b"VBRI":
+            frames = struct.unpack(">I", data[vbri_pos + 14:vbri_pos + 18])[0]
+            if frames:
+                return frames * samples / sample_rate
+
+    # No usable tag: walk the frame headers
+    total = 0
+    while pos + 4 <= end:
+        header = _parse_frame_header(data[pos:pos + 4])
+        if header is None or header[2] != sample_rate:
+            # Lost sync mid-stream; header-only timing isn't trustworthy
+            return None if end - pos > 1024 else total / sample_rate
+        total += header[3]
+        pos += header[4]
+    return total / sample_rate if total else None
+
+
+def wav_duration(path: str):
+    try:
+        with wave.open(path, "rb") as w:
+            return w.getnframes() / float(w.getframerate())
+    except (wave.Error, EOFError):
+        return None
+
+
+def write_duration_manifest(audio_dir: str, durations: dict):
+    """
+    Records {filename: seconds} for freshly written clips in audio_dir's
+    sidecar manifest, so later stages can read durations without probing.
+    """
+    manifest_path = os.path.join(audio_dir, DURATION_MANIFEST)
+    manifest = _load_manifest(manifest_path)
+    for name, seconds in durations.items():
+        manifest[name] = {
+            "duration": seconds,
+            "signature": file_signature(os.path.join(audio_dir, name))
+        }
+    atomic_write_json(manifest_path, manifest, indent=2)
+
+
+def _load_manifest(manifest_path: str) -> dict:
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def probe_duration(path: str) -> float:
+    """
+    Returns an audio file's duration in seconds, cheapest source first:
+    sidecar manifest, WAV/MP3 headers, then a full decode as a last resort.
+    """
+    audio_dir, name = os.path.split(path)
+    entry = _load_manifest(os.path.join(audio_dir, DURATION_MANIFEST)).get(name)
+    if entry and entry.get("signature") == file_signature(path):
+        return entry["duration"]
+
+    ext = os.path.splitext(path)[1].lower()
+    duration = None
+    if ext == ".wav":
+        duration = wav_duration(path)
+    elif ext == ".mp3":
+        duration = mp3_duration(path)
+    if duration is not None:
+        return duration
+
+    from pydub import AudioSegment
+    print(f"⚠️ Unreliable headers, decoding to measure: {path}")
+    return len(AudioSegment.from_file(path)) / 1000.0
@@ -0,0 +1,138 @@
+# scripts/audio_stream.py
+
+import json
+import os
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from scripts.voice_generator import (
+    parse_script, assign_voices, tts_generate, tts_generate_with_timestamps, finish_tts_cache,
+    TTS_MAX_IN_FLIGHT
+)
+from scripts.tts_cache import CacheStats
+from scripts.audio_postprocess import _process_clip
+from scripts.audio_probe import write_duration_manifest
+from scripts.caption_alignment import alignment_sidecar_path
+from scripts.generate_captions_data import clean_caption_text, load_chunked_captions, LINE_GAP_S
+from scripts.tracing import span
+
+# Lines synthesized/processed ahead of the consumer. Past this the pipeline
+# stops submitting TTS requests until the consumer catches up.
+STREAM_LOOKAHEAD = int(os.getenv("TTS_STREAM_LOOKAHEAD", "6"))
+
+
+def _speak_line(job, audio_dir, processed_dir, cpu_pool, with_timestamps, output_format, target_dBFS,
+                run_stats):
+    """TTS for one line, then its DSP as soon as the last byte lands. Returns (processed path, seconds)."""
+    speaker, text, voice_id, filename = job
+    with span("stream.line", "item", clip=filename) as trace:
+        print(f"[TTS] {speaker}: {text[:40]}...")
+        raw_path = os.path.join(audio_dir, filename)
+        if with_timestamps:
+            audio_bytes, alignment = tts_generate_with_timestamps(voice_id, text, run_stats=run_stats)
+        else:
+            audio_bytes, alignment = tts_generate(voice_id, text, stream=True, run_stats=run_stats), None
+        with open(raw_path, "wb") as f:
+            f.write(audio_bytes)
+
+        out_path = os.path.join(processed_dir, os.path.splitext(filename)[0] + "." + output_format)
+        args = (raw_path, out_path, speaker.lower(), "numpy", target_dBFS, output_format)
+        if cpu_pool is not None:
+            _, duration_ms = cpu_pool.submit(_process_clip, *args).result()
+        else:
+            _, duration_ms = _process_clip(*args)
+        if alignment:
+            for path in (raw_path, out_path):
+                with open(alignment_sidecar_path(path), "w", encoding="utf-8") as f:
+                    json.dump(alignment, f)
+        trace["audio_ms"] = duration_ms
+    return out_path, duration_ms / 1000.0
+
+
+def stream_captions(script_lines: list[tuple[str, str]], audio_dir: str = "assets/AudioTemp",
+                    processed_dir: str = "ProcessedAudio", max_in_flight: int = TTS_MAX_IN_FLIGHT,
+                    lookahead: int = STREAM_LOOKAHEAD, cpu_pool=None, with_timestamps: bool = False,
+                    output_format: str = "mp3", target_dBFS: float = -16.0):
+    """
+    Generator over caption entries ({start, end, speaker, text, audio_path},
+    as build_captions returns them), yielded in script order as soon as each
+    line has been synthesized (via the streaming TTS endpoint) and processed.
+
+    Lines are submitted in order and each goes straight from TTS into DSP, so
+    the first entry depends only on the first line. At most `lookahead`
+    lines are in flight or finished-but-unconsumed; a slow consumer holds
+    back further TTS requests. DSP runs in the worker threads, or in
+    cpu_pool (e.g. the batch runner's process pool) when given.
+    """
+    for path in (audio_dir, processed_dir):
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+    jobs = assign_voices(script_lines)
+    window = max(lookahead, max_in_flight, 1)
+
+    run_stats = CacheStats()
+    durations = {}
+    current_time = 0.0
+    pending = deque()
+    next_job = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(max_in_flight, 1)) as pool:
+            try:
+                while next_job < len(jobs) or pending:
+                    while next_job < len(jobs) and len(pending) < window:
+                        job = jobs[next_job]
+                        pending.append((job, pool.submit(_speak_line, job, audio_dir, processed_dir, cpu_pool,
+                                                         with_timestamps, output_format, target_dBFS,
+                                                         run_stats)))
+                        next_job += 1
+
+                    (speaker, text, _, _), future = pending.popleft()
+                    out_path, duration = future.result()
+                    durations[os.path.basename(out_path)] = duration
+                    entry = {
+                        "start": round(current_time, 2),
+                        "end": round(current_time + duration, 2),
+                        "speaker": speaker.lower(),
+                        "text": clean_caption_text(text),
+                        "audio_path": out_path
+                    }
+                    current_time += duration + LINE_GAP_S
+                    yield entry
+            finally:
+                # On error or an early stop, drop queued lines instead of synthesizing them
+                for _, future in pending:
+                    future.cancel()
+                if durations:
+                    write_duration_manifest(processed_dir, durations)
+    finally:
+        # After the pool drains, so in-flight lines count; also runs when the consumer stops early
+        finish_tts_cache(run_stats)
+
+
+def stream_and_save_captions(script_path: str, audio_dir: str, processed_dir: str, output_json_path: str,
+                             output_dir: str = "output", **kwargs) -> str:
+    """
+    Streaming replacement for generate_audio → postprocess_audio_clips →
+    generate_and_save_captions. Only TTS → DSP → captions streams: rendering
+    still starts once the whole script's captions.json is saved.
+    Writes the same captions.json (and chunk cache) as the batch path.
+    """
+    captions = []
+    start = time.perf_counter()
+    with span("stream.captions", "stage") as trace:
+        for entry in stream_captions(parse_script(script_path), audio_dir, processed_dir, **kwargs):
+            if not captions:
+                trace["first_caption_s"] = round(time.perf_counter() - start, 3)
+                print(f"[STREAM] First line ready after {trace['first_caption_s']:.2f}s")
+            captions.append(entry)
+        trace["lines"] = len(captions)
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, os.path.basename(output_json_path))
+    with open(output_path, "w") as out:
+        json.dump(captions, out, indent=2)
+
+    print(f"[✅] Saved {len(captions)} caption entries to {output_path}")
+    load_chunked_captions(output_path)
+    return output_path
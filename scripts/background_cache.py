@@ -0,0 +1,91 @@
+# scripts/background_cache.py
+
+import hashlib
+import json
+import os
+import random
+import subprocess
+from scripts.file_utils import file_hash, file_signature, temp_path, atomic_write_json
+from scripts.ffmpeg_render import get_ffmpeg_exe
+
+BACKGROUND_CACHE_DIR = "assets/BackgroundCache"
+BACKGROUND_INDEX = "index.json"
+
+
+def _load_index(cache_dir: str) -> dict:
+    try:
+        with open(os.path.join(cache_dir, BACKGROUND_INDEX), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_index(cache_dir: str, index: dict):
+    atomic_write_json(os.path.join(cache_dir, BACKGROUND_INDEX), index, indent=2)
+
+
+def _source_hash(src: str, index: dict) -> str:
+    # Backgrounds are large; only rehash when size/mtime change
+    entry = index.get("sources", {}).get(os.path.abspath(src))
+    signature = file_signature(src)
+    if entry and entry.get("signature") == signature:
+        return entry["hash"]
+    digest = file_hash(src)
+    index.setdefault("sources", {})[os.path.abspath(src)] = {"hash": digest, "signature": signature}
+    return digest
+
+
+def video_duration(path: str) -> float:
+    """Container duration in seconds, read by ffmpeg without decoding frames."""
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    return ffmpeg_parse_infos(path)["duration"]
+
+
+def prepare_background(src: str, width: int = 1080, height: int = 1920, fps: int = 30,
+                       cache_dir: str = BACKGROUND_CACHE_DIR) -> str:
+    """
+    Returns a copy of the background already scaled and center-cropped to
+    width x height at fps, with no audio. The transcode runs once per
+    (source hash, geometry); later renders read the cached file directly.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    index = _load_index(cache_dir)
+    digest = _source_hash(src, index)
+    key = hashlib.sha1(f"{digest}:{width}x{height}@{fps}".encode("utf-8")).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(src))[0]
+    out_path = os.path.join(cache_dir, f"{stem}_{width}x{height}_{fps}_{key}.mp4")
+
+    if not os.path.exists(out_path):
+        print(f"🎞️ Preparing background {src} ➝ {out_path}")
+        # Per-process, per-thread temp name: concurrent renders may prepare the same background
+        tmp_path = temp_path(out_path, ".tmp.mp4")
+        subprocess.run([
+            get_ffmpeg_exe(), "-y", "-loglevel", "error", "-i", src, "-an",
+            "-vf", f"scale=-2:{height},crop={width}:{height},fps={fps},setsar=1",
+            "-c:v", "libx264", "-preset", "medium", "-crf", "18", "-pix_fmt", "yuv420p",
+            # Keyframe every second so random start offsets seek cheaply
+            "-g", str(fps), tmp_path
+        ], check=True)
+        os.replace(tmp_path, out_path)
+
+    prepared = index.setdefault("prepared", {})
+    if os.path.basename(out_path) not in prepared:
+        prepared[os.path.basename(out_path)] = {"source": src, "duration": video_duration(out_path)}
+    _save_index(cache_dir, index)
+    return out_path
+
+
+def prepared_duration(path: str) -> float:
+    """Duration of a prepared background, from the cache index when recorded."""
+    cache_dir, name = os.path.split(path)
+    entry = _load_index(cache_dir).get("prepared", {}).get(name)
+    return entry["duration"] if entry else video_duration(path)
+
+
+def pick_start_offset(background_duration: float, needed: float, rng=random) -> float:
+    """
+    A random start time that still leaves `needed` seconds of background,
+    snapped to whole seconds (the prepared file's keyframe interval).
+    """
+    latest = int(background_duration - needed)
+    return float(rng.randint(0, latest)) if latest > 0 else 0.0
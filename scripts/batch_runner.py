@@ -0,0 +1,137 @@
+# scripts/batch_runner.py
+
+import argparse
+import csv
+import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from scripts.generate_captions_data import warm_syllable_dictionary
+from scripts.Metadata_generator import metadata_path, load_schedule, posting_row, POSTING_FIELDS
+from scripts.stage_cache import StageCache
+from scripts.stages import STAGES, TopicPaths, topic_stages, video_path
+
+WORK_ROOT = "work"
+SCHEDULE_PATH = "video_schedule.tsv"
+POSTING_SCHEDULE_PATH = "final_output/posting_schedule.csv"
+
+CPU_WORKERS = os.cpu_count() or 1
+# Topics in flight at once; each one holds a driver thread that mostly waits
+TOPIC_CONCURRENCY = int(os.getenv("BATCH_TOPIC_CONCURRENCY", "4"))
+# Per-stage limits. script/tts/metadata are network-bound and run on the
+# driver threads; postprocess/render are CPU-bound and go to the process pool.
+STAGE_LIMITS = {
+    "script": 3,
+    "tts": 2,
+    "postprocess": CPU_WORKERS,
+    "captions": 2,
+    "speech": 2,
+    "render": max(1, CPU_WORKERS // 4),
+    "metadata": 4,
+}
+
+
+class BatchRunner:
+    """
+    Runs script → TTS → postprocess → captions → render → metadata for every
+    scheduled topic. Topics proceed independently, so one topic's LLM/TTS
+    calls overlap with another's DSP and rendering; semaphores cap how many
+    topics are inside each stage at once. Each topic keeps a stage cache in
+    its work directory, so re-running the batch skips finished stages.
+    """
+
+    def __init__(self, work_root: str = WORK_ROOT, topic_concurrency: int = TOPIC_CONCURRENCY,
+                 cpu_workers: int = CPU_WORKERS, stage_limits: dict = None, render_kwargs: dict = None,
+                 force: set = None, stream: bool = False):
+        self.work_root = work_root
+        self.topic_concurrency = topic_concurrency
+        self.cpu_workers = cpu_workers
+        limits = dict(STAGE_LIMITS, **(stage_limits or {}))
+        self.semaphores = {stage: threading.Semaphore(limit) for stage, limit in limits.items()}
+        self.render_kwargs = render_kwargs or {}
+        self.force = force
+        self.stream = stream
+        self.cpu_pool = None
+
+    def _stage(self, topic: str, cache: StageCache, stage):
+        def execute():
+            with self.semaphores[stage.name]:
+                print(f"▶️ [{stage.name}] {topic}")
+                if stage.cpu:
+                    return self.cpu_pool.submit(stage.fn, *stage.args, **stage.kwargs).result()
+                return stage.fn(*stage.args, **stage.kwargs)
+        return cache.run(stage.name, execute, inputs=stage.inputs, outputs=stage.outputs, params=stage.params,
+                         result_outputs=stage.result_outputs)
+
+    def run_topic(self, topic: str) -> tuple:
+        paths = TopicPaths.for_topic(topic, self.work_root)
+        os.makedirs(paths.root, exist_ok=True)
+        cache = StageCache(paths.stage_manifest, force=self.force, trace_args={"topic": topic})
+
+        # One postprocess process per topic; parallelism comes from running topics side by side.
+        # Streamed lines go from TTS straight into DSP on the shared process pool.
+        results = {}
+        for stage in topic_stages(topic, paths, stream=self.stream, render_kwargs=self.render_kwargs,
+                                  postprocess_workers=1, cpu_pool=self.cpu_pool):
+            results[stage.name] = self._stage(topic, cache, stage)
+        return video_path(topic, paths, self.render_kwargs.get("profile")), results["metadata"]
+
+    def run(self, schedule_path: str = SCHEDULE_PATH, posting_path: str = POSTING_SCHEDULE_PATH):
+        """
+        Processes every topic in the schedule and writes the posting schedule
+        CSV in schedule order. A failed topic is reported and left out; the
+        rest still finish.
+        """
+        schedule = load_schedule(schedule_path)
+        results = {}
+        warm_syllable_dictionary()
+        with ProcessPoolExecutor(max_workers=self.cpu_workers, initializer=warm_syllable_dictionary) as cpu_pool, \
+                ThreadPoolExecutor(max_workers=max(self.topic_concurrency, 1)) as topic_pool:
+            self.cpu_pool = cpu_pool
+            futures = {topic: topic_pool.submit(self.run_topic, topic) for topic, _, _ in schedule}
+            for topic, future in futures.items():
+                try:
+                    results[topic] = future.result()
+                    print(f"✅ Finished: {topic} ➝ {results[topic][0]}")
+                except Exception:
+                    print(f"❌ Failed: {topic}\n{traceback.format_exc()}")
+
+        os.makedirs(os.path.dirname(posting_path) or ".", exist_ok=True)
+        with open(posting_path, "w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=POSTING_FIELDS)
+            writer.writeheader()
+            for topic, date, time in schedule:
+                if topic not in results:
+                    continue
+                _, metadata = results[topic]
+                metadata_file = metadata_path(metadata, TopicPaths.for_topic(topic, self.work_root).metadata)
+                writer.writerow(posting_row(topic, date, time, metadata, metadata_file))
+
+        print(f"[📦] {len(results)}/{len(schedule)} topics done, schedule saved: {posting_path}")
+        return results
+
+
+if __name__ == "__main__":
+    from scripts.render_profiles import RENDER_PROFILES, DEFAULT_PROFILE
+    from scripts.tracing import add_trace_arguments, start_trace_from_args, finish_trace_from_args
+
+    parser = argparse.ArgumentParser(description="Render every topic in the posting schedule.")
+    parser.add_argument("--schedule", default=SCHEDULE_PATH)
+    parser.add_argument("--work-root", default=WORK_ROOT)
+    parser.add_argument("--topics", type=int, default=TOPIC_CONCURRENCY, help="topics in flight at once")
+    parser.add_argument("--profile", choices=list(RENDER_PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument("--backend", choices=["moviepy", "ffmpeg"], default="moviepy")
+    parser.add_argument("--force", nargs="+", choices=STAGES + ["all"], default=[],
+                        help="stages to re-run even if unchanged")
+    parser.add_argument("--stream", action="store_true", help="stream TTS lines straight into DSP and captions")
+    parser.add_argument("--segments", type=int, default=1, help="parallel timeline segments per render")
+    add_trace_arguments(parser)
+    args = parser.parse_args()
+
+    start_trace_from_args(args)
+    force = STAGES if "all" in args.force else args.force
+    BatchRunner(work_root=args.work_root, topic_concurrency=args.topics, force=set(force),
+                stream=args.stream,
+                render_kwargs={"profile": args.profile, "backend": args.backend,
+                               "segments": args.segments}).run(args.schedule)
+    finish_trace_from_args(args)
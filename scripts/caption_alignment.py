@@ -0,0 +1,118 @@
+# scripts/caption_alignment.py
+
+import json
+import os
+import numpy as np
+from scripts.file_utils import file_hash
+
+ALIGN_CACHE_DIR = "assets/AlignCache"
+FRAME_MS = 10
+SNAP_WINDOW_MS = 120  # how far a boundary may move to land in a word gap
+
+
+def alignment_sidecar_path(audio_path: str) -> str:
+    return os.path.splitext(audio_path)[0] + ".alignment.json"
+
+
+def energy_profile(audio_path: str, cache_dir: str = ALIGN_CACHE_DIR) -> np.ndarray:
+    """
+    Returns per-frame RMS (FRAME_MS frames) of a clip's mono mix, cached on
+    disk by the audio file's hash so re-renders skip the decode.
+    """
+    cache_path = os.path.join(cache_dir, file_hash(audio_path) + ".npy")
+    if os.path.exists(cache_path):
+        return np.load(cache_path)
+
+    from pydub import AudioSegment
+    audio = AudioSegment.from_file(audio_path)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float32).reshape(-1, audio.channels)
+    mono = samples.mean(axis=1) / audio.max_possible_amplitude
+
+    frame = max(int(audio.frame_rate * FRAME_MS / 1000), 1)
+    n_frames = int(np.ceil(len(mono) / frame))
+    padded = np.zeros(n_frames * frame, dtype=np.float32)
+    padded[:len(mono)] = mono
+    rms = np.sqrt(np.mean(padded.reshape(n_frames, frame) ** 2, axis=1))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(cache_path, rms)
+    return rms
+
+
+def _energy_boundaries(rms: np.ndarray, weights: list[float]):
+    """
+    Places chunk boundaries (in frames) so each chunk gets voiced time in
+    proportion to its weight, then snaps each boundary to the quietest frame
+    nearby, which is usually the gap between words.
+    """
+    if len(rms) == 0:
+        return None
+    db = 20 * np.log10(rms + 1e-9)
+    floor, peak = np.percentile(db, 10), np.percentile(db, 95)
+    voiced = db > max(floor + 0.25 * (peak - floor), peak - 35)
+    voiced_time = np.cumsum(voiced)
+    if voiced_time[-1] == 0:
+        return None
+
+    fractions = np.cumsum(weights)[:-1] / np.sum(weights)
+    targets = np.searchsorted(voiced_time, fractions * voiced_time[-1])
+
+    smoothed = np.convolve(db, np.ones(3) / 3, mode="same")
+    window = SNAP_WINDOW_MS // FRAME_MS
+    boundaries = []
+    previous = 0
+    for target in targets:
+        lo = max(target - window, previous + 1)
+        hi = min(target + window + 1, len(rms) - 1)
+        if lo >= hi:
+            boundary = min(max(target, previous + 1), len(rms) - 1)
+        else:
+            boundary = lo + int(np.argmin(smoothed[lo:hi]))
+        boundaries.append(boundary)
+        previous = boundary
+    return np.array(boundaries) * FRAME_MS / 1000.0
+
+
+def _timestamp_boundaries(alignment: dict, chunk_word_counts: list[int]):
+    """
+    Uses the TTS provider's character timestamps: each chunk starts at its
+    first word's first character. Returns None if the words don't line up.
+    """
+    chars = alignment.get("characters", [])
+    starts = alignment.get("character_start_times_seconds", [])
+    word_starts = []
+    in_word = False
+    for ch, t in zip(chars, starts):
+        if ch.isspace():
+            in_word = False
+        elif not in_word:
+            word_starts.append(t)
+            in_word = True
+    if len(word_starts) != sum(chunk_word_counts):
+        return None
+    first_words = np.cumsum(chunk_word_counts)[:-1]
+    return np.array([word_starts[i] for i in first_words])
+
+
+def align_chunks(audio_path: str, chunks: list[str], weights: list[float], duration: float):
+    """
+    Returns [(start_offset, end_offset), ...] in seconds for each chunk within
+    its line's clip. Prefers provider character timestamps (from the
+    .alignment.json sidecar), then energy-based word-gap detection, then an
+    even split.
+    """
+    if len(chunks) <= 1:
+        return [(0.0, duration)]
+
+    boundaries = None
+    sidecar = alignment_sidecar_path(audio_path)
+    if os.path.exists(sidecar):
+        with open(sidecar, "r", encoding="utf-8") as f:
+            boundaries = _timestamp_boundaries(json.load(f), [len(c.split()) for c in chunks])
+    if boundaries is None and os.path.exists(audio_path):
+        boundaries = _energy_boundaries(energy_profile(audio_path), weights)
+    if boundaries is None:
+        boundaries = np.arange(1, len(chunks)) * duration / len(chunks)
+
+    edges = [0.0] + [float(min(max(b, 0.0), duration)) for b in boundaries] + [duration]
+    return list(zip(edges[:-1], edges[1:]))
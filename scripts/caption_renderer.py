@@ -0,0 +1,129 @@
+# scripts/caption_renderer.py
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+import numpy as np
+from scripts.compositor import LayerImage
+
+SPRITE_CACHE_SIZE = 256           # in-memory entries
+SPRITE_DISK_CACHE_DIR = None      # e.g. "assets/CaptionCache" to reuse sprites across runs
+
+
+class CaptionSprite:
+    """
+    A rasterized caption: shadow and stroked text baked into one straight-alpha
+    RGBA image, cropped to its visible pixels. (x, y) is the crop's offset
+    inside the caption box.
+    """
+
+    def __init__(self, rgb: np.ndarray, alpha: np.ndarray, x: int, y: int, box_size: tuple):
+        self.rgb = rgb
+        self.alpha = alpha
+        self.x = x
+        self.y = y
+        self.box_size = box_size
+        self._premultiplied = None
+        self._layer_image = None
+
+    @property
+    def premultiplied(self) -> np.ndarray:
+        """Float32 RGB already multiplied by alpha, for direct over-blending."""
+        if self._premultiplied is None:
+            self._premultiplied = self.rgb.astype(np.float32) * self.alpha[..., None]
+        return self._premultiplied
+
+    @property
+    def layer_image(self) -> LayerImage:
+        if self._layer_image is None:
+            self._layer_image = LayerImage(self.premultiplied, self.alpha)
+        return self._layer_image
+
+    def position(self, video_width: int, video_height: int) -> tuple:
+        """Top-left of the crop when the caption box is centered on the frame."""
+        box_w, box_h = self.box_size
+        return int((video_width - box_w) / 2) + self.x, int((video_height - box_h) / 2) + self.y
+
+    def to_clip(self, start: float, end: float, video_width: int, video_height: int):
+        from moviepy.video.VideoClip import ImageClip
+        mask = ImageClip(self.alpha, is_mask=True)
+        return ImageClip(self.rgb).with_mask(mask) \
+            .with_position(self.position(video_width, video_height)) \
+            .with_start(start) \
+            .with_duration(end - start)
+
+
+_memory_cache = OrderedDict()
+_stats = {"memory_hits": 0, "disk_hits": 0, "rendered": 0}
+
+
+def sprite_cache_stats() -> dict:
+    return dict(_stats)
+
+
+def _sprite_key(*params) -> str:
+    return hashlib.sha1(json.dumps(params).encode("utf-8")).hexdigest()
+
+
+def _rasterize(text, color, font, font_size, stroke_color, stroke_width, box_size, shadow_opacity):
+    from moviepy import TextClip
+    shadow = TextClip(text=text, font=font, font_size=font_size, color="black",
+                      method="caption", size=box_size)
+    main = TextClip(text=text, font=font, font_size=font_size, color=color,
+                    stroke_color=stroke_color, stroke_width=stroke_width,
+                    method="caption", size=box_size)
+
+    # Same result as compositing the black shadow (at shadow_opacity) and then
+    # the text over it: alpha = a_t + a_s(1 - a_t), color = text color (shadow is black)
+    a_s = shadow.mask.get_frame(0).astype(np.float32) * shadow_opacity
+    a_t = main.mask.get_frame(0).astype(np.float32)
+    alpha = a_t + a_s * (1 - a_t)
+    premult = main.get_frame(0).astype(np.float32) * a_t[..., None]
+    rgb = np.where(alpha[..., None] > 0, premult / np.maximum(alpha[..., None], 1e-6), 0)
+
+    ys, xs = np.nonzero(alpha)
+    if len(ys) == 0:
+        return CaptionSprite(np.zeros((1, 1, 3), np.uint8), np.zeros((1, 1), np.float32), 0, 0, box_size)
+    y0, y1, x0, x1 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+    return CaptionSprite(
+        np.round(rgb[y0:y1, x0:x1]).astype(np.uint8),
+        alpha[y0:y1, x0:x1],
+        int(x0), int(y0), box_size
+    )
+
+
+def render_caption_sprite(text, color, font, font_size, stroke_color, stroke_width,
+                          box_size, shadow_opacity=0.4, disk_cache_dir=None) -> CaptionSprite:
+    """
+    Returns the sprite for a caption, rasterizing it only the first time a
+    given (text, color, font, size, stroke) combination is seen.
+    """
+    box_size = tuple(int(v) for v in box_size)
+    font_stat = os.stat(font) if font and os.path.exists(font) else None
+    key = _sprite_key(text, color, font, font_stat.st_size if font_stat else None, font_size,
+                      stroke_color, stroke_width, box_size, shadow_opacity)
+
+    sprite = _memory_cache.get(key)
+    if sprite is not None:
+        _memory_cache.move_to_end(key)
+        _stats["memory_hits"] += 1
+        return sprite
+
+    disk_cache_dir = disk_cache_dir or SPRITE_DISK_CACHE_DIR
+    disk_path = os.path.join(disk_cache_dir, key + ".npz") if disk_cache_dir else None
+    if disk_path and os.path.exists(disk_path):
+        data = np.load(disk_path)
+        _stats["disk_hits"] += 1
+        sprite = CaptionSprite(data["rgb"], data["alpha"], int(data["x"]), int(data["y"]), box_size)
+    else:
+        sprite = _rasterize(text, color, font, font_size, stroke_color, stroke_width, box_size, shadow_opacity)
+        _stats["rendered"] += 1
+        if disk_path:
+            os.makedirs(disk_cache_dir, exist_ok=True)
+            np.savez_compressed(disk_path, rgb=sprite.rgb, alpha=sprite.alpha, x=sprite.x, y=sprite.y)
+
+    _memory_cache[key] = sprite
+    while len(_memory_cache) > SPRITE_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+    return sprite
@@ -0,0 +1,51 @@
+# scripts/clients.py
+
+import os
+import threading
+from dotenv import load_dotenv
+
+# Loaded here once so module-level os.getenv settings still see .env values
+load_dotenv()
+
+_lock = threading.Lock()
+_openai_client = None
+_elevenlabs_api_key = None
+
+
+def get_openai_client():
+    """
+    Returns the shared OpenAI client, building it on first use so modules
+    that never call the API don't import openai or need OPENAI_API_KEY.
+    """
+    global _openai_client
+    if _openai_client is None:
+        with _lock:
+            if _openai_client is None:
+                from openai import OpenAI
+                _openai_client = OpenAI()
+    return _openai_client
+
+
+def set_openai_client(client):
+    """Injects a client (e.g. one pointed at a stub server); None resets to the default."""
+    global _openai_client
+    _openai_client = client
+
+
+def openai_retryable_errors() -> tuple:
+    """OpenAI exceptions worth retrying: rate limits, timeouts and server errors."""
+    from openai import RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+    return (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+def get_elevenlabs_api_key() -> str:
+    """Returns the injected ElevenLabs key, else ELEVENLABS_API_KEY; raises only when TTS is used."""
+    key = _elevenlabs_api_key or os.getenv("ELEVENLABS_API_KEY")
+    if not key:
+        raise RuntimeError("Please set the ELEVENLABS_API_KEY environment variable.")
+    return key
+
+
+def set_elevenlabs_api_key(key: str):
+    global _elevenlabs_api_key
+    _elevenlabs_api_key = key
@@ -0,0 +1,104 @@
+# scripts/compositor.py
+
+from bisect import bisect_right
+from collections import namedtuple
+import numpy as np
+
+
+class LayerImage:
+    """
+    Overlay pixels prepared for blending: premultiplied float32 RGB and
+    inverse alpha. Built once and shared by every layer that shows the image.
+    """
+
+    def __init__(self, premultiplied: np.ndarray, alpha: np.ndarray):
+        self.premultiplied = premultiplied.astype(np.float32, copy=False)
+        self.inv_alpha = (1.0 - alpha.astype(np.float32))[..., None]
+        self.height, self.width = alpha.shape
+
+
+# An image shown at (x, y) for start <= t < end
+Layer = namedtuple("Layer", ["image", "x", "y", "start", "end"])
+
+
+class IntervalCompositor:
+    """
+    Composites timed overlays onto a background clip. A sweep over all layer
+    start/end times builds a sorted index of the layers active between each
+    pair of breakpoints, so each frame looks up and blends only the 1-3 live
+    layers instead of scanning every overlay.
+    """
+
+    def __init__(self, background, layers: list[Layer], duration: float = None):
+        self.background = background
+        self.layers = list(layers)
+        self.duration = duration if duration is not None else background.duration
+        self.width, self.height = background.size
+        self._scratch = np.empty((self.height, self.width, 3), dtype=np.float32)
+        self._out = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self._times, self._active = self._build_index()
+
+    def _build_index(self):
+        events = []
+        for i, layer in enumerate(self.layers):
+            if layer.end > layer.start:
+                events.append((layer.start, 1, i))
+                events.append((layer.end, -1, i))
+        events.sort()
+
+        times, active_sets = [], []
+        active = set()
+        k = 0
+        while k < len(events):
+            t = events[k][0]
+            while k < len(events) and events[k][0] == t:
+                _, kind, i = events[k]
+                if kind > 0:
+                    active.add(i)
+                else:
+                    active.discard(i)
+                k += 1
+            times.append(t)
+            active_sets.append(tuple(sorted(active)))  # layer order is z-order
+        return times, active_sets
+
+    def active_layers(self, t: float) -> tuple:
+        k = bisect_right(self._times, t) - 1
+        return self._active[k] if k >= 0 else ()
+
+    def frame(self, t: float) -> np.ndarray:
+        """
+        The composite at time t. Blends into one reused output buffer, so the
+        returned array is only valid until the next call (MoviePy encodes
+        each frame before asking for the next).
+        """
+        bg = self.background.get_frame(t)
+        active = self.active_layers(t)
+        if not active:
+            return bg
+
+        out = self._out
+        np.copyto(out, bg, casting="unsafe")
+        for i in active:
+            layer = self.layers[i]
+            image = layer.image
+            x0, y0 = max(layer.x, 0), max(layer.y, 0)
+            x1 = min(layer.x + image.width, self.width)
+            y1 = min(layer.y + image.height, self.height)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            lx, ly = x0 - layer.x, y0 - layer.y
+            h, w = y1 - y0, x1 - x0
+
+            # out = out * (1 - a) + premultiplied, in the reused float buffer
+            scratch = self._scratch[:h, :w]
+            np.multiply(out[y0:y1, x0:x1], image.inv_alpha[ly:ly + h, lx:lx + w], out=scratch)
+            scratch += image.premultiplied[ly:ly + h, lx:lx + w]
+            scratch += 0.5
+            out[y0:y1, x0:x1] = scratch
+        return out
+
+    def to_clip(self):
+        """Exposes the composite as a regular MoviePy clip."""
+        from moviepy.video.VideoClip import VideoClip
+        return VideoClip(frame_function=self.frame, duration=self.duration)
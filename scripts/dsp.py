@@ -0,0 +1,150 @@
+# scripts/dsp.py
+
+from typing import TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    from pydub import AudioSegment
+
+# Compressor envelope is evaluated once per hop instead of once per sample
+COMPRESSOR_HOP_MS = 0.25
+
+
+def segment_to_array(audio: "AudioSegment") -> np.ndarray:
+    """
+    Returns the samples of an AudioSegment as a float64 array shaped (frames, channels),
+    in integer sample units.
+    """
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float64)
+    return samples.reshape(-1, audio.channels)
+
+
+def array_to_segment(samples: np.ndarray, template: "AudioSegment") -> "AudioSegment":
+    """
+    Clips and converts a (frames, channels) array back to an AudioSegment with
+    the same format as template.
+    """
+    peak = template.max_possible_amplitude
+    dtype = {1: np.int8, 2: np.int16, 4: np.int32}[template.sample_width]
+    data = np.clip(np.round(samples), -peak, peak - 1).astype(dtype)
+    return template._spawn(data.tobytes())
+
+
+def db_to_gain(db: float) -> float:
+    return 10 ** (db / 20.0)
+
+
+def low_pass(x: np.ndarray, cutoff: float, frame_rate: int) -> np.ndarray:
+    """
+    One-pole RC low-pass, the same filter pydub's low_pass_filter runs per sample.
+    """
+    rc = 1.0 / (cutoff * 2 * np.pi)
+    dt = 1.0 / frame_rate
+    alpha = dt / (rc + dt)
+    # Initial state makes y[0] == x[0], as pydub does
+    zi = (1 - alpha) * x[:1]
+    from scipy.signal import lfilter  # scipy.signal takes ~0.7s to import; only DSP workers need it
+    y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, axis=0, zi=zi)
+    return y
+
+
+def high_pass(x: np.ndarray, cutoff: float, frame_rate: int, peak: float) -> np.ndarray:
+    """
+    One-pole RC high-pass, the same filter pydub's high_pass_filter runs per sample.
+    """
+    rc = 1.0 / (cutoff * 2 * np.pi)
+    dt = 1.0 / frame_rate
+    alpha = rc / (rc + dt)
+    zi = (1 - alpha) * x[:1]
+    from scipy.signal import lfilter
+    y, _ = lfilter([alpha, -alpha], [1.0, -alpha], x, axis=0, zi=zi)
+    return np.clip(y, -peak, peak - 1)
+
+
+def band_pass(x: np.ndarray, low: float, high: float, frame_rate: int, peak: float) -> np.ndarray:
+    return high_pass(low_pass(x, high, frame_rate), low, frame_rate, peak)
+
+
+def gain_envelope(frames: int, frame_rate: int, gain_db: float = 0.0,
+                  fade_in_ms: float = 0, fade_out_ms: float = 0) -> np.ndarray:
+    """
+    Fuses a static gain and linear fade in/out into one per-frame multiplier,
+    so the signal is scaled in a single pass.
+    """
+    env = np.full(frames, db_to_gain(gain_db))
+    fade_in = min(int(frame_rate * fade_in_ms / 1000), frames)
+    if fade_in:
+        env[:fade_in] *= np.arange(fade_in) / fade_in
+    fade_out = min(int(frame_rate * fade_out_ms / 1000), frames)
+    if fade_out:
+        env[frames - fade_out:] *= np.arange(fade_out, 0, -1) / fade_out
+    return env[:, None]
+
+
+def compress(x: np.ndarray, frame_rate: int, peak: float, threshold: float = -20.0,
+             ratio: float = 4.0, attack: float = 5.0, release: float = 50.0) -> np.ndarray:
+    """
+    Vectorized equivalent of pydub's compress_dynamic_range. The look-behind RMS
+    comes from a cumulative sum of squares, and the attack/release envelope is
+    stepped at COMPRESSOR_HOP_MS control rate and interpolated back to audio rate.
+    """
+    frames = len(x)
+    if frames == 0:
+        return x
+    thresh_rms = peak * db_to_gain(threshold)
+    look = int(frame_rate * attack / 1000)
+    attack_frames = frame_rate * attack / 1000
+    release_frames = frame_rate * release / 1000
+    hop = max(int(frame_rate * COMPRESSOR_HOP_MS / 1000), 1)
+
+    # RMS over the `look` frames preceding each hop point (all channels pooled)
+    power = np.concatenate(([0.0], np.cumsum(np.mean(x * x, axis=1))))
+    idx = np.arange(0, frames, hop)
+    lo = np.maximum(idx - look, 0)
+    counts = np.maximum(idx - lo, 1)
+    rms = np.sqrt((power[idx] - power[lo]) / counts)
+
+    with np.errstate(divide="ignore"):
+        over_db = np.where(rms > 0, 20 * np.log10(rms / thresh_rms), 0.0)
+    max_att = (1 - 1.0 / ratio) * np.maximum(over_db, 0.0)
+
+    # pydub's envelope rises by max_att/attack per step up to max_att, falls by
+    # max_att/release per step while above it, and holds below the threshold
+    # (where max_att is 0). Two passes replace that per-step loop: a release
+    # envelope assuming instant attack (running max of a linearly draining
+    # peak), then the attack limit on it (running min of a linear climb).
+    # Matches the loop to ~0.001 dB on average, ~0.25 dB at worst on onsets.
+    drained = np.cumsum(max_att * (hop / release_frames))
+    released = np.maximum.accumulate(max_att + drained) - drained
+    climb = np.cumsum(max_att * (hop / attack_frames))
+    att = climb + np.minimum(np.minimum.accumulate(released - climb), 0.0)
+
+    att_frames = np.interp(np.arange(frames), idx, att)
+    return x * (10 ** (-att_frames / 20.0))[:, None]
+
+
+def process_stewie_array(x: np.ndarray, frame_rate: int, peak: float) -> np.ndarray:
+    eq = high_pass(x, 140, frame_rate, peak)
+    eq = np.clip(low_pass(eq, 6000, frame_rate) * db_to_gain(1.5), -peak, peak - 1)
+    compressed = compress(eq, frame_rate, peak, threshold=-24, ratio=5.5, attack=2, release=100)
+    nasal = band_pass(compressed, 850, 1150, frame_rate, peak) * db_to_gain(2.0)
+    return compressed + nasal
+
+
+def process_peter_array(x: np.ndarray, frame_rate: int, peak: float) -> np.ndarray:
+    shaped = high_pass(low_pass(x, 2800, frame_rate), 150, frame_rate, peak)
+    shaped = shaped * gain_envelope(len(shaped), frame_rate, -3.5, 300, 300)
+    return compress(shaped, frame_rate, peak, threshold=-24.0, ratio=6.5, attack=3, release=300)
+
+
+def process_segment(audio: "AudioSegment", speaker: str) -> "AudioSegment":
+    """
+    Runs the NumPy version of a speaker's voice chain on an AudioSegment.
+    """
+    x = segment_to_array(audio)
+    peak = audio.max_possible_amplitude
+    if speaker == "stewie":
+        y = process_stewie_array(x, audio.frame_rate, peak)
+    else:
+        y = process_peter_array(x, audio.frame_rate, peak)
+    return array_to_segment(y, audio)
@@ -0,0 +1,168 @@
+# scripts/ffmpeg_render.py
+
+import math
+import os
+import subprocess
+import tempfile
+import numpy as np
+from PIL import Image
+
+
+def get_ffmpeg_exe() -> str:
+    """The ffmpeg binary MoviePy already uses (bundled with imageio-ffmpeg)."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except ImportError:
+        return "ffmpeg"
+
+
+def _first_frame_at(t: float, fps: int) -> int:
+    # Frame k shows a layer when start <= k / fps < end, as in the MoviePy/compositor paths
+    return math.ceil(t * fps - 1e-6)
+
+
+def _layer_rgba(image) -> np.ndarray:
+    alpha = 1.0 - image.inv_alpha[..., 0]
+    rgb = np.where(alpha[..., None] > 0, image.premultiplied / np.maximum(alpha[..., None], 1e-6), 0)
+    return np.dstack([np.clip(np.rint(rgb), 0, 255), np.rint(alpha * 255)]).astype(np.uint8)
+
+
+def assign_tracks(layers, fps: int) -> list[list[tuple]]:
+    """
+    Packs layers into as few overlay tracks as possible: (layer, first_frame,
+    last_frame) entries, never two on one track sharing a frame. A layer
+    always lands on a higher track than every earlier (lower z) layer it
+    overlaps, so stacking the tracks in order keeps the z-order. Captions
+    and character spans come out as two tracks.
+    """
+    tracks = []
+    for layer in layers:
+        first, last = _first_frame_at(layer.start, fps), _first_frame_at(layer.end, fps)
+        if last <= first:
+            continue
+        lowest = 0
+        for k, track in enumerate(tracks):
+            if any(f < last and first < l for _, f, l in track):
+                lowest = k + 1
+        if lowest == len(tracks):
+            tracks.append([])
+        tracks[lowest].append((layer, first, last))
+    return tracks
+
+
+def write_track(track, fps: int, tmp: str, index: int) -> tuple:
+    """
+    Writes one track as a concat-demuxer list of PNGs on a shared canvas
+    (the track's bounding box), each held for its frame count, with a
+    transparent spacer between entries. Returns (x, y, list_path).
+    """
+    x0 = min(layer.x for layer, _, _ in track) // 2 * 2
+    y0 = min(layer.y for layer, _, _ in track) // 2 * 2
+    x1 = max(layer.x + layer.image.width for layer, _, _ in track)
+    y1 = max(layer.y + layer.image.height for layer, _, _ in track)
+    width, height = x1 - x0 + (x1 - x0) % 2, y1 - y0 + (y1 - y0) % 2
+
+    spacer = os.path.join(tmp, f"track{index}_spacer.png")
+    Image.new("RGBA", (width, height)).save(spacer)
+    pngs, entries, cursor = {}, [], 0
+    for layer, first, last in sorted(track, key=lambda entry: entry[1]):
+        key = (id(layer.image), layer.x, layer.y)
+        if key not in pngs:
+            canvas = np.zeros((height, width, 4), dtype=np.uint8)
+            dx, dy = layer.x - x0, layer.y - y0
+            canvas[dy:dy + layer.image.height, dx:dx + layer.image.width] = _layer_rgba(layer.image)
+            pngs[key] = os.path.join(tmp, f"track{index}_{len(pngs)}.png")
+            Image.fromarray(canvas).save(pngs[key])
+        if first > cursor:
+            entries.append((spacer, first - cursor))
+        entries.append((pngs[key], last - first))
+        cursor = last
+    entries.append((spacer, 1))
+
+    list_path = os.path.join(tmp, f"track{index}.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write("ffconcat version 1.0\n")
+        for path, frames in entries:
+            f.write(f"file '{os.path.basename(path)}'\nduration {frames / fps:.6f}\n")
+        # The concat demuxer only honours the last duration when the file is repeated
+        f.write(f"file '{os.path.basename(spacer)}'\n")
+    return x0, y0, list_path
+
+
+def build_filter_graph(n_overlays: int, overlay_specs, width: int, height: int, fps: int,
+                       n_audio: int, prepared_background: bool = False,
+                       output_size: tuple = None) -> str:
+    """
+    Builds the filtergraph: scale/crop the background (input 0), overlay each
+    track (inputs 1..n_overlays, one timed PNG sequence each) at its (x, y),
+    and concat the dialogue clips (the inputs after that) into one audio
+    stream. A prepared background is already at the target geometry and
+    skips the scale/crop. output_size downscales the finished composite.
+    """
+    if prepared_background:
+        chains = [f"[0:v]fps={fps},setsar=1,setpts=PTS-STARTPTS[bg0]"]
+    else:
+        chains = [f"[0:v]scale=-2:{height},crop={width}:{height},fps={fps},setsar=1,setpts=PTS-STARTPTS[bg0]"]
+
+    current = "bg0"
+    for k, (x, y) in enumerate(overlay_specs):
+        # Convert each still once, before fps repeats it for every frame it's held
+        chains.append(f"[{k + 1}:v]format=yuva420p,fps={fps},setpts=PTS-STARTPTS[ov{k}]")
+        out = f"bg{k + 1}"
+        chains.append(f"[{current}][ov{k}]overlay=x={x}:y={y}:eof_action=pass:format=auto[{out}]")
+        current = out
+    if output_size:
+        chains.append(f"[{current}]scale={output_size[0]}:{output_size[1]},format=yuv420p[vout]")
+    else:
+        chains.append(f"[{current}]format=yuv420p[vout]")
+
+    if n_audio:
+        audio_inputs = "".join(f"[{n_overlays + 1 + i}:a]" for i in range(n_audio))
+        chains.append(f"{audio_inputs}concat=n={n_audio}:v=0:a=1[aout]")
+    return ";\n".join(chains)
+
+
+def render_with_ffmpeg(background_path: str, layers, audio_paths: list[str], output_path: str,
+                       duration: float, width: int = 1080, height: int = 1920, fps: int = 30,
+                       encoder_args: list[str] = None, prepared_background: bool = False,
+                       background_offset: float = 0.0, output_size: tuple = None, frames: int = None):
+    """
+    Renders the video in a single ffmpeg process: background crop/scale, the
+    PNG overlays as a few timed concat tracks, and concatenated dialogue
+    audio. No frames pass through Python. With no audio_paths the output is
+    video-only; frames, if given, sets the exact frame count instead of duration.
+    """
+    encoder_args = encoder_args or ["-c:v", "libx264", "-preset", "medium", "-crf", "23"]
+
+    with tempfile.TemporaryDirectory(prefix="ffrender_") as tmp:
+        # Every overlay rides on one of a few tracks, so per-frame cost
+        # follows how many layers can overlap, not how many there are
+        overlay_inputs, overlay_specs = [], []
+        for k, track in enumerate(assign_tracks(layers, fps)):
+            x, y, list_path = write_track(track, fps, tmp, k)
+            overlay_inputs += ["-f", "concat", "-safe", "0", "-i", list_path]
+            overlay_specs.append((x, y))
+
+        graph = build_filter_graph(len(overlay_specs), overlay_specs, width, height, fps,
+                                   len(audio_paths), prepared_background, output_size)
+        graph_path = os.path.join(tmp, "graph.txt")
+        with open(graph_path, "w", encoding="utf-8") as f:
+            f.write(graph)
+
+        cmd = [get_ffmpeg_exe(), "-y", "-loglevel", "error"]
+        if background_offset > 0:
+            # Round down: a seek point just past a frame's timestamp would drop that frame
+            cmd += ["-ss", f"{math.floor(background_offset * 1000) / 1000:.3f}"]
+        cmd += ["-i", background_path] + overlay_inputs
+        for path in audio_paths:
+            cmd += ["-i", path]
+        cmd += ["-filter_complex_script", graph_path, "-map", "[vout]"]
+        cmd += ["-map", "[aout]"] if audio_paths else ["-an"]
+        cmd += ["-frames:v", str(frames)] if frames else ["-t", f"{duration:.4f}"]
+        cmd += ["-r", str(fps)] + encoder_args
+        cmd += (["-c:a", "aac"] if audio_paths else []) + [output_path]
+
+        print(f"[FFMPEG] Rendering {len(layers)} overlays on {len(overlay_specs)} tracks in one pass ➝ {output_path}")
+        subprocess.run(cmd, check=True)
+    return output_path
@@ -0,0 +1,40 @@
+# scripts/file_utils.py
+
+import hashlib
+import json
+import os
+import threading
+
+
+def file_signature(path: str) -> list:
+    """[size, mtime_ns]: cheap change detection for memoizing per-file work."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def temp_path(path: str, suffix: str = ".tmp") -> str:
+    """A sibling temp name unique to this process and thread, for write-then-rename."""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}{suffix}"
+
+
+def atomic_write_bytes(path: str, data: bytes):
+    """Writes data so readers (and concurrent writers) only ever see a complete file."""
+    tmp_path = temp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(path: str, obj, **dump_kwargs):
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, **dump_kwargs)
+    os.replace(tmp_path, path)
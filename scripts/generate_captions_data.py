@@ -2,12 +2,17 @@
 
 import os
 import json
-from pydub import AudioSegment
-import textstat
+import hashlib
+from functools import lru_cache
+from scripts.audio_probe import probe_duration
+from scripts import caption_alignment
+from scripts.caption_alignment import align_chunks, alignment_sidecar_path
+from scripts.file_utils import file_hash
 
 SCRIPT_PATH = "script.txt"
 AUDIO_DIR = "assets\AudioTemp"
 OUTPUT_JSON = "captions.json"
+LINE_GAP_S = 0.0  # silence between lines; audio_mix lays the soundtrack out with the same gap
 import unicodedata
 import re
 
@@ -33,6 +38,18 @@ def clean_caption_text(text):
 
     return text
 
+def find_audio_file(audio_dir, stem):
+    """
+    Finds the clip for e.g. stem "peter1", accepting the MP3 or WAV output of
+    postprocess_audio_clips and the capitalized filenames written by generate_audio.
+    """
+    for name in (stem, stem.capitalize()):
+        for ext in (".wav", ".mp3"):
+            path = os.path.join(audio_dir, name + ext)
+            if os.path.exists(path):
+                return path
+    return None
+
 def build_captions(script_path, audio_dir):
     with open(script_path, "r", encoding="utf-8-sig") as f:
         lines = [line.strip() for line in f if ':' in line]
@@ -48,13 +65,12 @@ def build_captions(script_path, audio_dir):
         text = clean_caption_text(text)
 
         speaker_counts[speaker] += 1
-        audio_file = os.path.join(audio_dir, f"{speaker}{speaker_counts[speaker]}.mp3")
-        
-        if not os.path.exists(audio_file):
-            raise FileNotFoundError(f"Missing audio file: {audio_file}")
+        audio_file = find_audio_file(audio_dir, f"{speaker}{speaker_counts[speaker]}")
 
-        audio = AudioSegment.from_file(audio_file)
-        duration = len(audio) / 1000.0
+        if audio_file is None:
+            raise FileNotFoundError(f"Missing audio file: {os.path.join(audio_dir, f'{speaker}{speaker_counts[speaker]}.mp3')}")
+
+        duration = probe_duration(audio_file)
 
 
 
@@ -66,16 +82,64 @@ def build_captions(script_path, audio_dir):
             "audio_path": audio_file
         })
 
-        current_time += duration
+        current_time += duration + LINE_GAP_S
 
     return captions
+_SYLLABLE_DICT = {}
+
+def warm_syllable_dictionary():
+    """
+    Precomputes syllable counts for every word in cmudict (first pronunciation),
+    so lookups skip textstat entirely. The batch runner calls it in its
+    driver and every pool worker, so all of them chunk the same way.
+    """
+    if _SYLLABLE_DICT:
+        return
+    import cmudict
+    for word, prons in cmudict.dict().items():
+        if prons:
+            _SYLLABLE_DICT[word] = sum(1 for phone in prons[0] if phone[-1].isdigit())
+    estimate_syllables.cache_clear()
+
+@lru_cache(maxsize=16384)
 def estimate_syllables(word):
+    if _SYLLABLE_DICT:
+        count = _SYLLABLE_DICT.get(word.lower().strip(".,!?'\""))
+        if count is not None:
+            return max(count, 1)
+    import textstat
     return max(textstat.syllable_count(word), 1)  # fallback to 1 to avoid zero
 
-def syllable_chunked_captions(captions, max_syllables=3):
+def chunk_words(words, max_syllables=3):
+    """
+    Groups words into phrases of ≤ max_syllables each.
+    Returns [(chunk_text, syllable_count), ...].
+    """
+    chunks = []
+    current_chunk = []
+    current_syllables = 0
+
+    for word in words:
+        sylls = estimate_syllables(word)
+        if current_syllables + sylls > max_syllables and current_chunk:
+            chunks.append((" ".join(current_chunk), current_syllables))
+            current_chunk = [word]
+            current_syllables = sylls
+        else:
+            current_chunk.append(word)
+            current_syllables += sylls
+
+    if current_chunk:
+        chunks.append((" ".join(current_chunk), current_syllables))
+    return chunks
+
+def syllable_chunked_captions(captions, max_syllables=3, align=False):
     """
     Splits captions into phrases of ≤ max_syllables each,
     reassigns timing across the resulting chunks.
+
+    With align=True, chunk timing is derived from each line's audio (provider
+    character timestamps or word-gap detection) instead of an even split.
     """
     new_captions = []
 
@@ -85,31 +149,21 @@ def syllable_chunked_captions(captions, max_syllables=3):
         if total_duration <= 0 or not words:
             continue
 
-        # Build syllable-limited chunks
-        chunks = []
-        current_chunk = []
-        current_syllables = 0
-
-        for word in words:
-            sylls = estimate_syllables(word)
-            if current_syllables + sylls > max_syllables and current_chunk:
-                chunks.append(" ".join(current_chunk))
-                current_chunk = [word]
-                current_syllables = sylls
-            else:
-                current_chunk.append(word)
-                current_syllables += sylls
-
-        if current_chunk:
-            chunks.append(" ".join(current_chunk))
-
-        # Split duration evenly across chunks
-        chunk_duration = total_duration / len(chunks)
-        for i, chunk in enumerate(chunks):
+        chunks = chunk_words(words, max_syllables)
+        texts = [text for text, _ in chunks]
+
+        if align:
+            spans = align_chunks(cap["audio_path"], texts, [sylls for _, sylls in chunks], total_duration)
+        else:
+            # Split duration evenly across chunks
+            chunk_duration = total_duration / len(chunks)
+            spans = [(i * chunk_duration, (i + 1) * chunk_duration) for i in range(len(chunks))]
+
+        for chunk, (offset_start, offset_end) in zip(texts, spans):
             new_captions.append({
                 "text": chunk,
-                "start": cap["start"] + i * chunk_duration,
-                "end": cap["start"] + (i + 1) * chunk_duration,
+                "start": cap["start"] + offset_start,
+                "end": cap["start"] + offset_end,
                 "speaker": cap["speaker"],
                 "audio_path": cap["audio_path"]
             })
@@ -126,5 +180,50 @@ def generate_and_save_captions(script_path, audio_dir, output_json_path, output_
         json.dump(caption_data, out, indent=2)
 
     print(f"[✅] Saved {len(caption_data)} caption entries to {output_path}")
+    load_chunked_captions(output_path)
     return output_path  # Optional: return the path for downstream use
 
+def chunked_captions_path(captions_path):
+    return os.path.splitext(captions_path)[0] + ".chunks.json"
+
+@lru_cache(maxsize=None)
+def _chunker_code_hash():
+    # The chunking/alignment source, so code edits invalidate persisted chunks
+    return [file_hash(__file__), file_hash(caption_alignment.__file__)]
+
+def _alignment_inputs(captions):
+    """Hashes of every line's audio and timestamp sidecar, which aligned timing depends on."""
+    hashes = {}
+    for cap in captions:
+        for path in (cap["audio_path"], alignment_sidecar_path(cap["audio_path"])):
+            if path not in hashes:
+                hashes[path] = file_hash(path) if os.path.exists(path) else None
+    return hashes
+
+def load_chunked_captions(captions_path, max_syllables=3, align=False):
+    """
+    Returns syllable_chunked_captions for captions_path, reusing the persisted
+    .chunks.json next to it when it was built from the same captions content,
+    chunking parameters and code (and, when aligning, the same audio).
+    """
+    with open(captions_path, "rb") as f:
+        raw = f.read()
+    captions = json.loads(raw)
+    salt = [max_syllables, align, _chunker_code_hash(), bool(_SYLLABLE_DICT),
+            _alignment_inputs(captions) if align else None]
+    key = hashlib.sha256(raw + json.dumps(salt, sort_keys=True).encode()).hexdigest()
+
+    chunks_path = chunked_captions_path(captions_path)
+    try:
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("key") == key:
+            return cached["captions"]
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    chunked = syllable_chunked_captions(captions, max_syllables=max_syllables, align=align)
+    with open(chunks_path, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "captions": chunked}, f, indent=2)
+    return chunked
+
@@ -0,0 +1,58 @@
+# scripts/render_profiles.py
+
+import os
+
+# Compositing always happens at full 1080x1920 so layout stays identical;
+# "scale" only shrinks the encoded output.
+RENDER_PROFILES = {
+    # Caption/timing review: half resolution, half frame rate, fastest x264 preset
+    "draft": {"fps": 15, "scale": (540, 960), "preset": "ultrafast", "crf": 32,
+              "tune": None, "faststart": False, "suffix": "_draft"},
+    # Same settings as MoviePy's libx264 defaults
+    "standard": {"fps": 30, "scale": None, "preset": "medium", "crf": 23,
+                 "tune": None, "faststart": False, "suffix": ""},
+    # Upload quality: slower preset, low CRF, moov atom up front for streaming
+    "final": {"fps": 30, "scale": None, "preset": "slow", "crf": 18,
+              "tune": "animation", "faststart": True, "suffix": ""},
+}
+DEFAULT_PROFILE = "standard"
+
+
+def get_profile(name: str = None) -> dict:
+    name = name or DEFAULT_PROFILE
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{name}' (choose from {', '.join(RENDER_PROFILES)})")
+    return RENDER_PROFILES[name]
+
+
+def render_threads() -> int:
+    return os.cpu_count() or 1
+
+
+def _x264_options(profile: dict) -> list[str]:
+    args = ["-crf", str(profile["crf"])]
+    if profile["tune"]:
+        args += ["-tune", profile["tune"]]
+    if profile["faststart"]:
+        args += ["-movflags", "+faststart"]
+    return args
+
+
+def moviepy_write_kwargs(profile: dict, threads: int = None) -> dict:
+    """Keyword arguments for VideoClip.write_videofile."""
+    params = _x264_options(profile)
+    if profile["scale"]:
+        params += ["-vf", "scale={}:{}".format(*profile["scale"])]
+    return {
+        "fps": profile["fps"],
+        "codec": "libx264",
+        "preset": profile["preset"],
+        "threads": threads or render_threads(),
+        "ffmpeg_params": params
+    }
+
+
+def ffmpeg_encoder_args(profile: dict, threads: int = None) -> list[str]:
+    """Video encoder arguments for the ffmpeg backend (scaling happens in the filtergraph)."""
+    return ["-c:v", "libx264", "-preset", profile["preset"],
+            "-threads", str(threads or render_threads())] + _x264_options(profile)
@@ -0,0 +1,27 @@
+# scripts/retry.py
+
+import random
+import time
+
+
+def call_with_retries(fn, *args, retries=4, base_delay=1.0, max_delay=30.0,
+                      retry_on=(Exception,), get_delay=None, **kwargs):
+    """
+    Calls fn(*args, **kwargs), retrying on the given exception types with
+    exponential backoff plus jitter. get_delay(exc) may return a server-provided
+    delay (e.g. Retry-After) to use instead of the computed backoff.
+    """
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except retry_on as e:
+            attempt += 1
+            if attempt > retries:
+                raise
+            delay = get_delay(e) if get_delay else None
+            if delay is None:
+                delay = min(max_delay, base_delay * (2 ** (attempt - 1)))
+                delay += random.uniform(0, delay * 0.25)
+            print(f"🔁 Retry {attempt}/{retries} in {delay:.1f}s after: {e.__class__.__name__}")
+            time.sleep(delay)
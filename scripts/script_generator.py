@@ -1,10 +1,18 @@
 import json
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from scripts.clients import get_openai_client, openai_retryable_errors
+from scripts.retry import call_with_retries
+from scripts.tracing import span, llm_usage
+from scripts.Metadata_generator import (
+    METADATA_GUIDELINES, METADATA_SCHEMA, build_metadata_prompt_from_script,
+    metadata_cache_key, store_cached_metadata
+)
 
-load_dotenv()
-client = OpenAI()
+# Variant generation limits (override via env for batch runs)
+VARIANT_CONCURRENCY = int(os.getenv("VARIANT_CONCURRENCY", "5"))
+VARIANT_TIMEOUT = float(os.getenv("VARIANT_TIMEOUT", "60"))
+VARIANT_RETRIES = 4
 
 
 def build_user_message(topic: str):
@@ -50,70 +58,142 @@ def build_system_message():
     )
 }
 
-def generate_variants(topic: str, count: int = 5):
-    system_msg = build_system_message()
-    user_msg = build_user_message(topic)
-    scripts = []
-    for i in range(count):
-        response = client.chat.completions.create(
+def generate_variant(system_msg, user_msg, temperature: float) -> str:
+    """
+    Generates a single script variant, retrying on rate limits, timeouts and
+    transient server errors.
+    """
+    request_client = get_openai_client().with_options(timeout=VARIANT_TIMEOUT, max_retries=0)
+    with span("llm.variant", "api", temperature=temperature) as trace:
+        response = call_with_retries(
+            request_client.chat.completions.create,
             model="gpt-4.1",
             messages=[system_msg, user_msg],
             max_tokens=500,
-            temperature=0.7 + i * 0.05
+            temperature=temperature,
+            retries=VARIANT_RETRIES,
+            retry_on=openai_retryable_errors()
         )
-        script = response.choices[0].message.content.strip()
-        scripts.append(script)
-    return scripts
+        trace.update(llm_usage(response))
+    return response.choices[0].message.content.strip()
+
+
+def generate_variants(topic: str, count: int = 5, max_workers: int = VARIANT_CONCURRENCY):
+    """
+    Generates `count` script variants, up to `max_workers` requests in flight.
+    Variants are returned in temperature order regardless of completion order.
+    """
+    system_msg = build_system_message()
+    user_msg = build_user_message(topic)
+    temperatures = [0.7 + i * 0.05 for i in range(count)]
+
+    if max_workers <= 1:
+        return [generate_variant(system_msg, user_msg, t) for t in temperatures]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, count)) as pool:
+        futures = [pool.submit(generate_variant, system_msg, user_msg, t) for t in temperatures]
+        return [future.result() for future in futures]
 
 
-def evaluate_scripts(topic: str, scripts: list[str]) -> int:
+def judge_response_format(count: int, with_metadata: bool = False) -> dict:
+    """JSON schema for the judge's reply; selected_index is constrained to 1..count."""
+    properties = {
+        "selected_index": {"type": "integer", "enum": list(range(1, count + 1))},
+        "reason": {"type": "string"}
+    }
+    if with_metadata:
+        properties["metadata"] = METADATA_SCHEMA
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "script_judgement",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False
+            }
+        }
+    }
+
+
+def judge_scripts(topic: str, scripts: list[str], with_metadata: bool = False) -> dict:
+    """
+    Picks the best script in one call. With with_metadata, the same call also
+    writes the title/caption/hashtags for the winner, saving the separate
+    metadata round-trip. Returns {"selected_index", "reason"[, "metadata"]}.
+    """
+    system_content = (
+        "You are a short-form video strategist. Your task is to review multiple script versions for a TikTok. "
+        "You must choose the **single best script** — the one most likely to go viral based on hook strength, clarity, pacing, and entertainment value.\n\n"
+        f"Return ONLY a JSON object with \"selected_index\" (a number from 1–{len(scripts)}) and \"reason\" (a short explanation)."
+    )
+    if with_metadata:
+        system_content += (
+            "\n\nThen, for the selected script only, act as a short-form content strategist and "
+            + METADATA_GUIDELINES +
+            "Put these in \"metadata\" with keys 'title', 'caption', and 'hashtags'."
+        )
     eval_prompt = [
-        {
-            "role": "system",
-            "content": (
-                "You are a short-form video strategist. Your task is to review multiple script versions for a TikTok. "
-                "You must choose the **single best script** — the one most likely to go viral based on hook strength, clarity, pacing, and entertainment value.\n\n"
-                "Return ONLY a JSON object in this format:\n"
-                "{\n  \"selected_index\": [number from 1–5],\n  \"reason\": \"Short explanation here.\"\n}"
-            )
-        },
+        {"role": "system", "content": system_content},
         {
             "role": "user",
             "content": (
-                f"Here are 5 TikTok scripts for the topic: \"{topic}\"\n\n"
+                f"Here are {len(scripts)} TikTok scripts for the topic: \"{topic}\"\n\n"
                 + "\n\n---\n\n".join([f"Script {i+1}:\n{script}" for i, script in enumerate(scripts)])
             )
         }
     ]
-    
-    response = client.chat.completions.create(
-        model="gpt-4.1",
-        messages=eval_prompt,
-        max_tokens=500,
-        temperature=0.5
-    )
 
-    raw = response.choices[0].message.content.strip()
+    request_client = get_openai_client().with_options(timeout=VARIANT_TIMEOUT, max_retries=0)
+    with span("llm.judge", "api", with_metadata=with_metadata) as trace:
+        response = call_with_retries(
+            request_client.chat.completions.create,
+            model="gpt-4.1",
+            messages=eval_prompt,
+            max_tokens=900 if with_metadata else 500,
+            temperature=0.5,
+            response_format=judge_response_format(len(scripts), with_metadata),
+            retries=VARIANT_RETRIES,
+            retry_on=openai_retryable_errors()
+        )
+        trace.update(llm_usage(response))
 
-    # Try parsing the JSON response
+    message = response.choices[0].message
     try:
-        result = json.loads(raw)
-        best_index = result.get("selected_index", 1)
-        reason = result.get("reason", "No reason provided.")
+        # The schema guarantees the shape; only a refusal or truncation can fail here
+        if getattr(message, "refusal", None):
+            raise ValueError(f"refused: {message.refusal}")
+        result = json.loads(message.content)
+        result["selected_index"] = min(max(int(result["selected_index"]), 1), len(scripts))
     except Exception as e:
-        best_index = 1
-        reason = f"[PARSE ERROR] {e}\nRaw response: {raw}"
+        result = {"selected_index": 1, "reason": f"[PARSE ERROR] {e}\nRaw response: {message.content}"}
+    return result
 
-    return best_index, reason
 
+def evaluate_scripts(topic: str, scripts: list[str]) -> tuple:
+    result = judge_scripts(topic, scripts)
+    return result["selected_index"], result["reason"]
 
-def generate_best_script(topic: str, save_path: str = "script.txt"):
+
+def generate_best_script(topic: str, save_path: str = "script.txt", with_metadata: bool = False):
+    """
+    Generates variants, judges them, and saves the winner. with_metadata has
+    the judge also write the post metadata, which is stored in the metadata
+    cache so save_metadata_for_script for this script needs no request.
+    """
     scripts = generate_variants(topic, count=5)
-    best_index, reason = evaluate_scripts(topic, scripts)
+    result = judge_scripts(topic, scripts, with_metadata=with_metadata)
+    best_index, reason = result["selected_index"], result["reason"]
     best_script = scripts[best_index - 1]
 
     with open(save_path, "w", encoding="utf-8") as f:
         f.write(best_script)
 
+    if result.get("metadata"):
+        messages = build_metadata_prompt_from_script(best_script.strip())
+        store_cached_metadata(metadata_cache_key(messages), result["metadata"])
+
     print(f"\n🎯 Best Script: Variant {best_index}\n🧠 Why: {reason}")
     return best_script
\ No newline at end of file
@@ -0,0 +1,140 @@
+# scripts/segment_render.py
+
+import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from scripts.ffmpeg_render import get_ffmpeg_exe, render_with_ffmpeg, _first_frame_at
+from scripts.render_profiles import get_profile, render_threads, moviepy_write_kwargs, ffmpeg_encoder_args
+from scripts.tracing import span
+
+
+def plan_segments(caption_data, total_frames: int, fps: int, n_segments: int) -> list[tuple[int, int]]:
+    """
+    Splits [0, total_frames) into up to n_segments frame ranges of roughly
+    equal length. Cuts land on the first frame of a caption chunk, so few
+    overlays straddle a cut and every segment starts on a whole frame.
+    """
+    boundaries = sorted({_first_frame_at(cap["start"], fps) for cap in caption_data})
+    boundaries = [b for b in boundaries if 0 < b < total_frames]
+    cuts = []
+    for i in range(1, max(n_segments, 1)):
+        candidates = [b for b in boundaries if not cuts or b > cuts[-1]]
+        if not candidates:
+            break
+        target = total_frames * i / n_segments
+        cuts.append(min(candidates, key=lambda b: abs(b - target)))
+    edges = [0] + cuts + [total_frames]
+    return list(zip(edges, edges[1:]))
+
+
+def segment_captions(caption_data, first: int, last: int, fps: int) -> list[dict]:
+    """
+    Chunks visible in frames [first, last), shifted to segment time. Start
+    and end sit half a frame before the first frame shown/hidden, so
+    rounding in the shifted times can't move a caption change by a frame.
+    """
+    clipped = []
+    for cap in caption_data:
+        shown = max(_first_frame_at(cap["start"], fps), first)
+        hidden = min(_first_frame_at(cap["end"], fps), last)
+        if hidden > shown:
+            clipped.append(dict(cap, start=(shown - first - 0.5) / fps, end=(hidden - first - 0.5) / fps))
+    return clipped
+
+
+def _render_segment(job: dict) -> str:
+    """Worker: composites and encodes one segment, video only."""
+    from scripts import video_assembler
+    from scripts.compositor import IntervalCompositor
+
+    profile = get_profile(job["profile"])
+    fps, frames = profile["fps"], job["frames"]
+    width, height = video_assembler.VIDEO_WIDTH, video_assembler.VIDEO_HEIGHT
+    layers = video_assembler.build_overlay_layers(job["captions"], width, height)
+
+    with span("render.segment", "render", segment=job["index"], backend=job["backend"]) as trace:
+        if job["backend"] == "ffmpeg":
+            render_with_ffmpeg(job["background_path"], layers, [], job["path"], frames / fps,
+                               width=width, height=height, fps=fps,
+                               encoder_args=ffmpeg_encoder_args(profile, job["threads"]),
+                               prepared_background=job["prepared"], background_offset=job["offset"],
+                               output_size=profile["scale"], frames=frames)
+        else:
+            video = video_assembler.load_background(job["background_path"], job["prepared"])
+            video = video.subclipped(job["offset"], min(job["offset"] + frames / fps, video.duration))
+            # write_videofile renders int(duration * fps) frames; half a frame of slack keeps it exact
+            clip = IntervalCompositor(video, layers, duration=(frames + 0.5) / fps).to_clip()
+            clip.write_videofile(job["path"], audio=False, logger=None,
+                                 **moviepy_write_kwargs(profile, job["threads"]))
+            video.close()
+        trace["frames"] = frames
+    return job["path"]
+
+
+def concat_segments(segment_paths: list[str], audio_paths: list[str], output_path: str,
+                    duration: float, faststart: bool = False):
+    """
+    Joins the encoded segments with the concat demuxer (stream copy, no
+    re-encode) and muxes the concatenated dialogue audio in the same pass.
+    """
+    with tempfile.TemporaryDirectory(prefix="concat_") as tmp:
+        list_path = os.path.join(tmp, "segments.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in segment_paths:
+                escaped = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+
+        cmd = [get_ffmpeg_exe(), "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path]
+        for path in audio_paths:
+            cmd += ["-i", path]
+        audio_inputs = "".join(f"[{i + 1}:a]" for i in range(len(audio_paths)))
+        cmd += [
+            "-filter_complex", f"{audio_inputs}concat=n={len(audio_paths)}:v=0:a=1[aout]",
+            "-map", "0:v", "-map", "[aout]", "-c:v", "copy", "-c:a", "aac",
+            "-t", f"{duration:.4f}"
+        ]
+        if faststart:
+            cmd += ["-movflags", "+faststart"]
+        subprocess.run(cmd + [output_path], check=True)
+    return output_path
+
+
+def render_segmented(background_path: str, caption_data, audio_paths: list[str], output_path: str,
+                     duration: float, profile: str = None, backend: str = "moviepy",
+                     prepared_background: bool = True, background_offset: float = 0.0,
+                     segments: int = None, workers: int = None) -> str:
+    """
+    Renders the timeline as independent segments in parallel worker
+    processes, then stream-copies them together and adds the audio once.
+    Each segment is encoded with the same settings and opens on a keyframe,
+    so the pieces join without re-encoding. x264 threads are divided
+    between the workers.
+    """
+    render_profile = get_profile(profile)
+    fps = render_profile["fps"]
+    workers = workers or os.cpu_count() or 1
+    ranges = plan_segments(caption_data, int(duration * fps), fps, segments or workers)
+    workers = min(workers, len(ranges))
+    threads = max(1, render_threads() // workers)
+
+    with tempfile.TemporaryDirectory(prefix="segments_", dir=os.path.dirname(output_path) or ".") as tmp:
+        jobs = []
+        for index, (first, last) in enumerate(ranges):
+            jobs.append({
+                "index": index, "path": os.path.join(tmp, f"segment_{index:03d}.mp4"),
+                "background_path": background_path, "prepared": prepared_background,
+                "offset": background_offset + first / fps, "frames": last - first,
+                "captions": segment_captions(caption_data, first, last, fps),
+                "profile": profile, "backend": backend, "threads": threads
+            })
+
+        print(f"[SEGMENTS] Rendering {len(jobs)} segments on {workers} workers ➝ {output_path}")
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                paths = list(pool.map(_render_segment, jobs))
+        else:
+            paths = [_render_segment(job) for job in jobs]
+        with span("render.concat", "render", segments=len(paths)):
+            concat_segments(paths, audio_paths, output_path, duration, render_profile["faststart"])
+    return output_path
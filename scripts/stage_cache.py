@@ -0,0 +1,154 @@
+# scripts/stage_cache.py
+
+import ast
+import hashlib
+import inspect
+import json
+import os
+import threading
+from functools import lru_cache
+from scripts.file_utils import file_hash, file_signature, atomic_write_json
+from scripts.tracing import span
+
+STAGE_MANIFEST = "output/.stage_cache.json"
+
+
+class StageCache:
+    """
+    Skips pipeline stages whose inputs haven't changed. Each stage declares
+    input paths (files or directories, including the source files of the code
+    it runs), output paths, and parameters; the hash of all three is stored in
+    a JSON manifest with a fingerprint of the outputs. A stage runs again only
+    if its key changes or its outputs were modified or removed.
+    """
+
+    def __init__(self, manifest_path: str = STAGE_MANIFEST, force: set = None, trace_args: dict = None):
+        self.manifest_path = manifest_path
+        self.force = set(force or ())
+        self.trace_args = trace_args or {}
+        self._lock = threading.Lock()
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {}
+        self.manifest.setdefault("stages", {})
+        self.manifest.setdefault("files", {})
+
+    def _hash_file(self, path: str) -> str:
+        # Content hashes are memoized by size/mtime so large inputs are read once
+        signature = file_signature(path)
+        abspath = os.path.abspath(path)
+        with self._lock:
+            entry = self.manifest["files"].get(abspath)
+        if entry and entry["signature"] == signature:
+            return entry["hash"]
+        digest = file_hash(path)
+        with self._lock:
+            self.manifest["files"][abspath] = {"signature": signature, "hash": digest}
+        return digest
+
+    def fingerprint(self, paths) -> str:
+        """Hash of the names and contents of every file under paths; missing paths hash as absent."""
+        h = hashlib.sha1()
+        for path in paths:
+            h.update(path.encode("utf-8"))
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for name in sorted(files):
+                        full = os.path.join(root, name)
+                        h.update(os.path.relpath(full, path).encode("utf-8"))
+                        h.update(self._hash_file(full).encode("utf-8"))
+            elif os.path.isfile(path):
+                h.update(self._hash_file(path).encode("utf-8"))
+            else:
+                h.update(b"<missing>")
+        return h.hexdigest()
+
+    def stage_key(self, inputs, params: dict) -> str:
+        payload = json.dumps([self.fingerprint(inputs), params], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def is_fresh(self, name: str, key: str, outputs) -> bool:
+        entry = self.manifest["stages"].get(name)
+        if name in self.force or not entry or entry["key"] != key:
+            return False
+        outputs = list(outputs) + entry.get("result_outputs", [])
+        if not all(os.path.exists(path) for path in outputs):
+            return False
+        return entry["outputs"] == self.fingerprint(outputs)
+
+    def record(self, name: str, key: str, outputs, result=None, result_outputs=()):
+        try:
+            json.dumps(result)
+        except TypeError:
+            result = None
+        result_outputs = list(result_outputs)
+        outputs_fingerprint = self.fingerprint(list(outputs) + result_outputs)
+        with self._lock:
+            self.manifest["stages"][name] = {"key": key, "outputs": outputs_fingerprint, "result": result,
+                                             "result_outputs": result_outputs}
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        atomic_write_json(self.manifest_path, self.manifest, indent=2)
+
+    def run(self, name: str, fn, inputs=(), outputs=(), params: dict = None, result_outputs=None):
+        """
+        Calls fn() unless the stage is up to date, in which case the result
+        recorded on its last run is returned instead. result_outputs(result)
+        names outputs only known once the stage has run (e.g. a file named
+        after a generated title); they're checked like `outputs` next time.
+        """
+        with span(f"stage.{name}", "stage", **self.trace_args) as trace:
+            key = self.stage_key(list(inputs), params or {})
+            trace["cached"] = self.is_fresh(name, key, outputs)
+            if trace["cached"]:
+                print(f"⏭️ [{name}] up to date, skipping")
+                return self.manifest["stages"][name]["result"]
+            result = fn()
+            self.record(name, key, outputs, result, result_outputs(result) if result_outputs else ())
+            return result
+
+
+def _module_source(name: str):
+    """Source path of a top-level scripts.* module, or None for anything else."""
+    package, _, module = name.partition(".")
+    if package != __package__ or not module or "." in module:
+        return None
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), module + ".py")
+    return path if os.path.isfile(path) else None
+
+
+@lru_cache(maxsize=None)
+def _imported_modules(name: str) -> frozenset:
+    # Walks the whole tree, so imports deferred into function bodies count too
+    with open(_module_source(name), "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module)
+            names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return frozenset(name for name in names if _module_source(name))
+
+
+def code_inputs(*entry_points) -> list[str]:
+    """
+    Source paths of the scripts modules defining entry_points (functions or
+    modules) and of every scripts module they import, transitively, so any
+    code edit invalidates the stages that run it.
+    """
+    pending = [entry.__name__ if inspect.ismodule(entry) else entry.__module__ for entry in entry_points]
+    seen = set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        pending.extend(_imported_modules(name))
+    return sorted(_module_source(name) for name in seen)
@@ -0,0 +1,96 @@
+# scripts/stages.py
+
+import os
+from collections import namedtuple
+from scripts.script_generator import generate_best_script
+from scripts.voice_generator import parse_script, generate_audio, tts_params
+from scripts.audio_postprocess import postprocess_audio_clips
+from scripts.generate_captions_data import generate_and_save_captions
+from scripts.audio_stream import stream_and_save_captions
+from scripts.video_assembler import assemble_video, render_params, render_inputs, safe_filename
+from scripts.Metadata_generator import save_metadata_for_script, metadata_path
+from scripts.render_profiles import get_profile
+from scripts.stage_cache import code_inputs
+
+STAGES = ["script", "tts", "postprocess", "captions", "speech", "render", "metadata"]
+
+# One stage run: fn(*args, **kwargs) plus what StageCache.run needs. cpu marks
+# CPU-bound stages the batch runner sends to its process pool.
+Stage = namedtuple("Stage", ["name", "fn", "args", "kwargs", "inputs", "outputs", "params", "result_outputs",
+                             "cpu"], defaults=[(), None, None, False])
+
+
+class TopicPaths:
+    """Everything one topic reads or writes. Captions, the stage manifest and the video go under root."""
+
+    def __init__(self, root: str, script: str, audio_raw: str, audio_processed: str, metadata: str,
+                 preview: str = None):
+        self.root = root
+        self.script = script
+        self.audio_raw = audio_raw
+        self.audio_processed = audio_processed
+        self.captions = os.path.join(root, "captions.json")
+        self.metadata = metadata
+        self.stage_manifest = os.path.join(root, ".stage_cache.json")
+        # Stitched preview MP3 of the raw lines; None skips it
+        self.preview = preview
+
+    @classmethod
+    def single(cls):
+        """The pipeline.py layout: one topic at a time in the repo's working folders."""
+        return cls("output", "script.txt", "assets/AudioTemp", "ProcessedAudio", "metadata",
+                   preview="output/output.mp3")
+
+    @classmethod
+    def for_topic(cls, topic: str, work_root: str):
+        """The batch layout: one work_root/<slug>/ directory per topic."""
+        root = os.path.join(work_root, safe_filename(topic))
+        return cls(root, os.path.join(root, "script.txt"), os.path.join(root, "AudioTemp"),
+                   os.path.join(root, "ProcessedAudio"), os.path.join(root, "metadata"))
+
+
+def video_path(topic: str, paths: TopicPaths, profile: str = None) -> str:
+    return os.path.join(paths.root, f"{safe_filename(topic)}{get_profile(profile)['suffix']}.mp4")
+
+
+def topic_stages(topic: str, paths: TopicPaths, stream: bool = False, render_kwargs: dict = None,
+                 postprocess_workers: int = None, cpu_pool=None):
+    """
+    Yields the stages for one topic in order. It's a generator on purpose:
+    the caller runs each stage before asking for the next, so arguments like
+    the parsed script are read only once the stage that writes them is done.
+    stream=True replaces tts/postprocess/captions with one "speech" stage.
+    """
+    render_kwargs = render_kwargs or {}
+    captions_dir = os.path.dirname(paths.captions)
+
+    # The judge also writes the post metadata, so the metadata stage is a cache hit
+    yield Stage("script", generate_best_script, (topic,), {"save_path": paths.script, "with_metadata": True},
+                code_inputs(generate_best_script), [paths.script], {"topic": topic, "with_metadata": True})
+    if stream:
+        yield Stage("speech", stream_and_save_captions,
+                    (paths.script, paths.audio_raw, paths.audio_processed, paths.captions),
+                    {"output_dir": captions_dir, "cpu_pool": cpu_pool},
+                    [paths.script] + code_inputs(stream_and_save_captions),
+                    [paths.audio_raw, paths.audio_processed, paths.captions], tts_params())
+    else:
+        preview = [paths.preview] if paths.preview else []
+        yield Stage("tts", generate_audio, (parse_script(paths.script),),
+                    {"output_path": paths.preview, "stitch_preview": bool(paths.preview),
+                     "audio_dir": paths.audio_raw},
+                    [paths.script] + code_inputs(generate_audio), [paths.audio_raw] + preview, tts_params())
+        yield Stage("postprocess", postprocess_audio_clips, (paths.audio_raw, paths.audio_processed),
+                    {"workers": postprocess_workers},
+                    [paths.audio_raw] + code_inputs(postprocess_audio_clips), [paths.audio_processed], cpu=True)
+        yield Stage("captions", generate_and_save_captions, (paths.script, paths.audio_processed, paths.captions),
+                    {"output_dir": captions_dir},
+                    [paths.script, paths.audio_processed] + code_inputs(generate_and_save_captions),
+                    [paths.captions])
+    yield Stage("render", assemble_video, (topic,),
+                dict(render_kwargs, captions_path=paths.captions, output_dir=paths.root),
+                [paths.captions, paths.audio_processed] + render_inputs() + code_inputs(assemble_video),
+                [video_path(topic, paths, render_kwargs.get("profile"))],
+                dict(render_params(), topic=topic, **render_kwargs), cpu=True)
+    yield Stage("metadata", save_metadata_for_script, (paths.script,), {"metadata_dir": paths.metadata},
+                [paths.script] + code_inputs(save_metadata_for_script),
+                result_outputs=lambda metadata: [metadata_path(metadata, paths.metadata)])
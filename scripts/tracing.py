@@ -0,0 +1,163 @@
+# scripts/tracing.py
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource  # Unix only; peak RSS is omitted elsewhere
+except ImportError:
+    resource = None
+
+# JSONL path; set it (or call enable_tracing) to turn tracing on. Worker
+# processes inherit it and append their own events to the same file.
+TRACE_ENV = "ECONAI_TRACE"
+
+_lock = threading.Lock()
+
+
+def tracing_enabled() -> bool:
+    return bool(os.getenv(TRACE_ENV))
+
+
+def enable_tracing(jsonl_path: str, append: bool = False):
+    """Turns tracing on for this process and any workers it starts afterwards."""
+    os.makedirs(os.path.dirname(jsonl_path) or ".", exist_ok=True)
+    if not append:
+        open(jsonl_path, "w", encoding="utf-8").close()
+    os.environ[TRACE_ENV] = jsonl_path
+
+
+def add_trace_arguments(parser):
+    parser.add_argument("--trace", metavar="JSONL", help="record stage/API/render timings to this file")
+    parser.add_argument("--chrome-trace", metavar="JSON", help="also write a Chrome trace (needs --trace)")
+
+
+def start_trace_from_args(args):
+    if args.trace:
+        enable_tracing(args.trace)
+
+
+def finish_trace_from_args(args):
+    if not args.trace:
+        return
+    print_trace_summary(args.trace)
+    if args.chrome_trace:
+        write_chrome_trace(args.trace, args.chrome_trace)
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None, None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return round(own, 1), round(children, 1)
+
+
+def _emit(event: dict):
+    line = json.dumps(event, default=str) + "\n"
+    with _lock:
+        # One short append per event, so lines from several processes don't interleave
+        with open(os.environ[TRACE_ENV], "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+@contextmanager
+def span(name: str, category: str = "stage", **args):
+    """
+    Times the enclosed block: wall time, this thread's CPU time, the whole
+    process's CPU time and peak RSS. Yields a dict the block can add fields to
+    (bytes, frames, cache hits...); they are recorded with the span, and a
+    "frames" count also yields frames_per_s.
+    """
+    if not tracing_enabled():
+        yield args
+        return
+    start = time.time()
+    wall0, cpu0, proc0 = time.perf_counter(), time.thread_time(), time.process_time()
+    error = None
+    try:
+        yield args
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        wall = time.perf_counter() - wall0
+        if args.get("frames") and wall > 0:
+            args["frames_per_s"] = round(args["frames"] / wall, 2)
+        peak, children_peak = _peak_rss_mb()
+        event = {
+            "type": "span", "name": name, "cat": category,
+            "pid": os.getpid(), "tid": threading.get_ident(), "start": start,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(time.thread_time() - cpu0, 6),
+            "process_cpu_s": round(time.process_time() - proc0, 6),
+            "peak_rss_mb": peak, "children_peak_rss_mb": children_peak,
+            "args": args
+        }
+        if error:
+            event["error"] = error
+        _emit(event)
+
+
+def llm_usage(response) -> dict:
+    """Token counts and reply size from an OpenAI chat completion, for span args."""
+    usage = getattr(response, "usage", None)
+    fields = {"bytes_in": len((response.choices[0].message.content or "").encode("utf-8"))}
+    if usage is not None:
+        fields.update(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+    return fields
+
+
+def counter(name: str, **values):
+    """Records a point-in-time set of values, e.g. cache hit/miss totals."""
+    if tracing_enabled():
+        _emit({"type": "counter", "name": name, "pid": os.getpid(), "tid": threading.get_ident(),
+               "start": time.time(), "args": values})
+
+
+def load_trace(jsonl_path: str) -> list[dict]:
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_chrome_trace(jsonl_path: str, chrome_path: str):
+    """Converts the JSONL trace into Chrome trace format (chrome://tracing, Perfetto)."""
+    events = []
+    for event in load_trace(jsonl_path):
+        base = {"name": event["name"], "pid": event["pid"], "tid": event["tid"],
+                "ts": event["start"] * 1e6}
+        if event["type"] == "span":
+            args = dict(event["args"], cpu_s=event["cpu_s"], peak_rss_mb=event["peak_rss_mb"])
+            events.append(dict(base, ph="X", cat=event["cat"], dur=event["wall_s"] * 1e6, args=args))
+        else:
+            numeric = {k: v for k, v in event["args"].items() if isinstance(v, (int, float))}
+            events.append(dict(base, ph="C", args=numeric))
+    os.makedirs(os.path.dirname(chrome_path) or ".", exist_ok=True)
+    with open(chrome_path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    print(f"[TRACE] Chrome trace saved to {chrome_path}")
+
+
+def summarize_trace(jsonl_path: str) -> dict:
+    """Total wall/CPU seconds and call count per span name."""
+    summary = {}
+    for event in load_trace(jsonl_path):
+        if event["type"] != "span":
+            continue
+        entry = summary.setdefault(event["name"], {"count": 0, "wall_s": 0.0, "cpu_s": 0.0})
+        entry["count"] += 1
+        entry["wall_s"] += event["wall_s"]
+        entry["cpu_s"] += event["cpu_s"]
+    return summary
+
+
+def print_trace_summary(jsonl_path: str):
+    summary = summarize_trace(jsonl_path)
+    for name, entry in sorted(summary.items(), key=lambda item: -item[1]["wall_s"]):
+        print(f"[TRACE] {name:<24} {entry['count']:>4}×  wall {entry['wall_s']:8.2f}s  cpu {entry['cpu_s']:8.2f}s")
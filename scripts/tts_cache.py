@@ -0,0 +1,126 @@
+# scripts/tts_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from scripts.file_utils import atomic_write_bytes
+
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "assets/TTSCache")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "500")) * 1024 * 1024
+
+
+def normalize_tts_text(text: str) -> str:
+    """
+    Normalizes line text so cosmetic differences (unicode forms, spacing)
+    map to the same cache entry.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class CacheStats:
+    """Hit/miss counts, safe to update from several threads. One per run, plus cache lifetime totals."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+class TTSCache:
+    """
+    Content-addressed on-disk cache of synthesized audio with size-based LRU
+    eviction. Entries are keyed on everything that affects the rendered audio:
+    voice, model, voice settings and normalized text.
+    """
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.totals = CacheStats()
+
+    @staticmethod
+    def make_key(voice_id: str, model_id: str, voice_settings: dict, text: str) -> str:
+        blob = json.dumps(
+            [voice_id, model_id, voice_settings, normalize_tts_text(text)],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key + suffix)
+
+    def get(self, key: str, suffix: str = ".mp3", run_stats: CacheStats = None):
+        """
+        Returns cached bytes or None. A hit refreshes the entry's LRU position.
+        The lookup is counted in the lifetime totals and in run_stats, if given.
+        """
+        path = self._path(key, suffix)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            data = None
+        for stats in (self.totals, run_stats):
+            if stats is not None:
+                stats.record(data is not None)
+        return data
+
+    def put(self, key: str, data: bytes, suffix: str = ".mp3"):
+        path = self._path(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write_bytes(path, data)
+
+    def evict(self):
+        """
+        Deletes least recently used entries until the cache fits in max_bytes.
+        Called once per run rather than on every put to avoid rescanning.
+        """
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self) -> dict:
+        """Lifetime totals for this cache object; see CacheStats for per-run counts."""
+        return self.totals.as_dict()
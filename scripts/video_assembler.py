@@ -1,16 +1,21 @@
 import json
 import os
-from scripts.generate_captions_data import syllable_chunked_captions
+from scripts.generate_captions_data import load_chunked_captions
+from scripts.caption_renderer import render_caption_sprite, sprite_cache_stats
+from scripts.tracing import span, counter
+from scripts.compositor import IntervalCompositor, Layer, LayerImage
+from scripts.ffmpeg_render import render_with_ffmpeg
+from scripts.segment_render import render_segmented
+from scripts.audio_probe import probe_duration
+from scripts.audio_mix import premixed_soundtrack, mix_params, mix_inputs
+from scripts.render_profiles import get_profile, moviepy_write_kwargs, ffmpeg_encoder_args
+from scripts.background_cache import prepare_background, prepared_duration, pick_start_offset
+import numpy as np
 import re
-from moviepy import (
-    VideoFileClip,
-    AudioFileClip,
-    CompositeAudioClip,
-    CompositeVideoClip,
-    concatenate_audioclips,
-    TextClip,
-    ColorClip
-)
+from functools import lru_cache
+
+# MoviePy is imported where it's used, so the ffmpeg backend and modules that
+# only need render_params()/safe_filename() don't pay for it
 
 # === CONFIGURATION ===
 VIDEO_PATH = "assets/backgrounds/SO6.mp4"
@@ -25,6 +30,24 @@ STROKE_COLOR = "black"
 PETER_IMG_PATH = "assets/images/peter_resized.png"
 STEWIE_IMG_PATH = "assets/images/stewie_resized.png"
 CHAR_IMG_HEIGHT = 500  # You can adjust for size
+VIDEO_WIDTH = 1080
+VIDEO_HEIGHT = 1920
+FPS = 30
+
+def render_params():
+    """Config that affects the rendered frames, for the stage cache key."""
+    return {
+        "video_path": VIDEO_PATH, "font_path": FONT_PATH, "font_size": FONT_SIZE,
+        "stewie_color": STEWIE_COLOR, "peter_color": PETER_COLOR,
+        "caption_width_pct": CAPTION_WIDTH_PCT, "stroke_width": STROKE_WIDTH,
+        "stroke_color": STROKE_COLOR, "peter_img_path": PETER_IMG_PATH,
+        "stewie_img_path": STEWIE_IMG_PATH, "char_img_height": CHAR_IMG_HEIGHT,
+        "size": [VIDEO_WIDTH, VIDEO_HEIGHT], "fps": FPS, **mix_params()
+    }
+
+def render_inputs():
+    """Asset files read by assemble_video, besides the captions and audio."""
+    return [VIDEO_PATH, FONT_PATH, PETER_IMG_PATH, STEWIE_IMG_PATH] + mix_inputs()
 
 def safe_filename(text: str) -> str:
     return re.sub(r'[^a-zA-Z0-9_\-]', '_', text.strip().lower())
@@ -38,44 +61,22 @@ def load_captions(path):
 def create_caption_clip(text, start, end, color, video_width, video_height):
     """
     Create a caption overlay with a subtle stroke/glow effect, layered on the video.
+    The shadow is baked into a cached sprite, so each chunk is a single image clip.
     """
-    max_text_width = int(video_width * CAPTION_WIDTH_PCT)
-    position = ("center", "center")
-
-    # Soft shadow behind text for glow effect
-    shadow = TextClip(
-        text=text,
-        font=FONT_PATH,
-        font_size=FONT_SIZE,
-        color="black",  # shadow color
-        method="caption",
-        size=(max_text_width, FONT_SIZE * 2)
-    ).with_position((position[0], position[1])) \
-     .with_opacity(0.4) \
-     .with_start(start) \
-     .with_duration(end - start)
-
-    # Main visible text
-    text_clip = TextClip(
-        text=text,
-        font=FONT_PATH,
-        font_size=FONT_SIZE,
-        color=color,
-        stroke_color=STROKE_COLOR,
-        stroke_width=STROKE_WIDTH,
-        method="caption",
-        size=(max_text_width, FONT_SIZE * 2)
-    ).with_position(position) \
-     .with_start(start) \
-     .with_duration(end - start)
-
-    return [shadow, text_clip]
-
-from moviepy.video.VideoClip import ImageClip
+    sprite = caption_sprite(text, color, video_width)
+    return [sprite.to_clip(start, end, video_width, video_height)]
 
-def create_character_overlay(speaker, start, end, video_width, video_height):
+@lru_cache(maxsize=None)
+def load_character_image(img_path, img_height):
     """
-    Returns a positioned ImageClip for the given speaker between start and end time.
+    Decodes and resizes a speaker image once; overlays are cheap copies of this clip.
+    """
+    from moviepy.video.VideoClip import ImageClip
+    return ImageClip(img_path).resized(height=img_height)
+
+def character_placement(speaker, video_width, video_height):
+    """
+    Returns (img_path, img_height, position) for a speaker, or None.
     """
     if speaker.lower() == "peter":
         img_path = PETER_IMG_PATH
@@ -86,59 +87,186 @@ def create_character_overlay(speaker, start, end, video_width, video_height):
         img_height = int(CHAR_IMG_HEIGHT)  # 1.3x size for Stewie
         position = (50, video_height - img_height - 50)
     else:
+        return None
+    return img_path, img_height, position
+
+@lru_cache(maxsize=None)
+def load_character_layer_image(img_path, img_height):
+    clip = load_character_image(img_path, img_height)
+    rgb = clip.get_frame(0).astype(np.float32)
+    alpha = clip.mask.get_frame(0) if clip.mask is not None else np.ones(rgb.shape[:2], np.float32)
+    return LayerImage(rgb * alpha[..., None], alpha)
+
+def create_character_overlay(speaker, start, end, video_width, video_height):
+    """
+    Returns a positioned ImageClip for the given speaker between start and end time.
+    """
+    placement = character_placement(speaker, video_width, video_height)
+    if placement is None:
         return []
+    img_path, img_height, position = placement
 
-    img_clip = ImageClip(img_path) \
-        .resized(height=img_height)\
+    img_clip = load_character_image(img_path, img_height) \
         .with_position(position) \
         .with_start(start) \
         .with_duration(end - start)
 
     return [img_clip]
 
-# === MAIN FUNCTION ===
-def assemble_video(topic: str):
-    audioCAP_data = load_captions(CAPTIONS_PATH)
-    caption_data = syllable_chunked_captions(audioCAP_data)  # 👈 Add this line
-    # Load background video and adjust
-    video = VideoFileClip(VIDEO_PATH)
-    video = video.without_audio()
-    video = video.resized(height=1920)
-    video = video.cropped(x_center=video.w / 2, width=1080, height=1920)
-
-    # Combine dialogue audio
-    dialogue_audio_clips = [AudioFileClip(cap["audio_path"]) for cap in audioCAP_data]
-    dialogue_audio = concatenate_audioclips(dialogue_audio_clips)
-
-    # Mix background + dialogue audio
-    video_duration = dialogue_audio.duration
-    video = video.subclipped(0, video_duration)
-
-    # Generate captions
-    overlay_clips = []
+def merge_speaker_spans(caption_data, tolerance=0.01):
+    """
+    Collapses consecutive chunks by the same speaker into one (speaker, start, end)
+    span, so a line gets one character overlay instead of one per chunk.
+    """
+    spans = []
     for cap in caption_data:
-        speaker = cap["speaker"]
-        text = cap["text"]
-        start = cap["start"]
-        end = cap["end"]
-        color = STEWIE_COLOR if speaker.lower() == "stewie" else PETER_COLOR
-        overlay_clips += create_caption_clip(text, start, end, color, video.w, video.h)
-        overlay_clips += create_character_overlay(speaker, start, end, video.w, video.h)
+        if cap["end"] <= cap["start"]:
+            continue
+        speaker = cap["speaker"].lower()
+        if spans and spans[-1][0] == speaker and cap["start"] - spans[-1][2] <= tolerance:
+            spans[-1][2] = max(spans[-1][2], cap["end"])
+        else:
+            spans.append([speaker, cap["start"], cap["end"]])
+    return [tuple(span) for span in spans]
 
-        # Debug: Print timing info to catch zero-duration captions
-        duration = end - start
-        print(f"[CAPTION] '{text[:30]}' | start: {start:.2f}s, end: {end:.2f}s, duration: {duration:.2f}s")
+def caption_color(speaker):
+    return STEWIE_COLOR if speaker.lower() == "stewie" else PETER_COLOR
+
+def caption_sprite(text, color, video_width):
+    return render_caption_sprite(
+        text, color, FONT_PATH, FONT_SIZE, STROKE_COLOR, STROKE_WIDTH,
+        box_size=(int(video_width * CAPTION_WIDTH_PCT), FONT_SIZE * 2),
+        shadow_opacity=0.4
+    )
 
+def build_overlay_layers(caption_data, video_width, video_height):
+    """
+    Returns compositor Layers for every caption chunk and merged character
+    span, in the same z-order the MoviePy path stacks its clips.
+    """
+    layers = []
+    for cap in caption_data:
+        if cap["end"] <= cap["start"]:
+            continue
+        sprite = caption_sprite(cap["text"], caption_color(cap["speaker"]), video_width)
+        x, y = sprite.position(video_width, video_height)
+        layers.append(Layer(sprite.layer_image, x, y, cap["start"], cap["end"]))
+
+    for speaker, start, end in merge_speaker_spans(caption_data):
+        placement = character_placement(speaker, video_width, video_height)
+        if placement is None:
+            continue
+        img_path, img_height, (x, y) = placement
+        layers.append(Layer(load_character_layer_image(img_path, img_height), int(x), int(y), start, end))
+    return layers
+
+def load_background(path, prepared=True):
+    """Opens the background without audio; an unprepared one is resized and cropped on the fly."""
+    from moviepy import VideoFileClip
+
+    video = VideoFileClip(path).without_audio()
+    if not prepared:
+        video = video.resized(height=VIDEO_HEIGHT)
+        video = video.cropped(x_center=video.w / 2, width=VIDEO_WIDTH, height=VIDEO_HEIGHT)
+    return video
+
+# === MAIN FUNCTION ===
+def assemble_video(topic: str, align_captions: bool = False, compositor: str = "interval",
+                   backend: str = "moviepy", prepare_bg: bool = True, random_start: bool = False,
+                   profile: str = None, captions_path: str = CAPTIONS_PATH,
+                   output_dir: str = "output", segments: int = 1, workers: int = None,
+                   soundtrack: str = None):
+    """
+    Renders the final video. compositor="interval" blends overlays with the
+    interval-indexed IntervalCompositor; compositor="moviepy" stacks every
+    overlay in one CompositeVideoClip as before. backend="ffmpeg" skips
+    MoviePy entirely and renders with a single ffmpeg filtergraph.
+    prepare_bg reads a cached pre-cropped copy of the background instead of
+    resizing every frame; random_start begins it at a random offset.
+    profile picks encoder settings from RENDER_PROFILES ("draft", "standard", "final").
+    segments > 1 splits the timeline at caption boundaries and composites the
+    pieces in `workers` processes (interval compositor or ffmpeg backend).
+    soundtrack is a premixed WAV; by default the dialogue (and music bed, if
+    MUSIC_PATH is set) is mixed into a temporary one, deleted after muxing.
+    """
+    render_profile = get_profile(profile)
+    caption_data = load_chunked_captions(captions_path, align=align_captions)
+    os.makedirs(output_dir, exist_ok=True)
+    FINAL_OUTPUT = os.path.join(output_dir, f"{safe_filename(topic)}{render_profile['suffix']}.mp4")
+
+    for cap in caption_data:
+        # Debug: Print timing info to catch zero-duration captions
+        duration = cap["end"] - cap["start"]
+        print(f"[CAPTION] '{cap['text'][:30]}' | start: {cap['start']:.2f}s, end: {cap['end']:.2f}s, duration: {duration:.2f}s")
         if duration <= 0:
             print("⚠️ SKIPPING: Caption has zero or negative duration")
-            continue
 
-    print(f"[INFO] Total overlay clips created: {len(overlay_clips)}")
-    FINAL_OUTPUT = os.path.join("output", f"{safe_filename(topic)}.mp4")
-    # Final composite
-    final_video = CompositeVideoClip([video] + overlay_clips)
-    final_video = final_video.with_audio(dialogue_audio)
-    final_video.write_videofile(FINAL_OUTPUT, fps=30, threads=8)
+    with premixed_soundtrack(captions_path, output_dir, soundtrack) as soundtrack:
+        duration = probe_duration(soundtrack)
+        background_path = VIDEO_PATH
+        if prepare_bg:
+            background_path = prepare_background(VIDEO_PATH, VIDEO_WIDTH, VIDEO_HEIGHT, FPS)
+
+        if segments > 1:
+            offset = pick_start_offset(prepared_duration(background_path), duration) \
+                if prepare_bg and random_start else 0.0
+            with span("render.encode", "render", backend=backend, segments=segments) as trace:
+                render_segmented(background_path, caption_data, [soundtrack], FINAL_OUTPUT, duration,
+                                 profile=profile, backend=backend, prepared_background=prepare_bg,
+                                 background_offset=offset, segments=segments, workers=workers)
+                trace["frames"] = int(duration * render_profile["fps"])
+            return FINAL_OUTPUT
+
+        if backend == "ffmpeg":
+            layers = build_overlay_layers(caption_data, VIDEO_WIDTH, VIDEO_HEIGHT)
+            offset = pick_start_offset(prepared_duration(background_path), duration) \
+                if prepare_bg and random_start else 0.0
+            counter("sprite_cache", **sprite_cache_stats())
+            with span("render.encode", "render", backend="ffmpeg") as trace:
+                render_with_ffmpeg(background_path, layers, [soundtrack], FINAL_OUTPUT, duration,
+                                   width=VIDEO_WIDTH, height=VIDEO_HEIGHT, fps=render_profile["fps"],
+                                   encoder_args=ffmpeg_encoder_args(render_profile),
+                                   prepared_background=prepare_bg, background_offset=offset,
+                                   output_size=render_profile["scale"])
+                trace["frames"] = int(duration * render_profile["fps"])
+            return FINAL_OUTPUT
+
+        from moviepy import AudioFileClip, CompositeVideoClip
+
+        # Load background video and adjust
+        video = load_background(background_path, prepared=prepare_bg)
+
+        # One reader for the whole premixed soundtrack
+        dialogue_audio = AudioFileClip(soundtrack)
+        video_duration = dialogue_audio.duration
+        offset = pick_start_offset(video.duration, video_duration) if random_start else 0.0
+        video = video.subclipped(offset, offset + video_duration)
+
+        if compositor == "interval":
+            layers = build_overlay_layers(caption_data, video.w, video.h)
+            print(f"[INFO] Total overlay layers created: {len(layers)}")
+            final_video = IntervalCompositor(video, layers, duration=video.duration).to_clip()
+        else:
+            # Generate captions
+            overlay_clips = []
+            for cap in caption_data:
+                if cap["end"] <= cap["start"]:
+                    continue
+                overlay_clips += create_caption_clip(cap["text"], cap["start"], cap["end"],
+                                                     caption_color(cap["speaker"]), video.w, video.h)
+            for speaker, start, end in merge_speaker_spans(caption_data):
+                overlay_clips += create_character_overlay(speaker, start, end, video.w, video.h)
+            print(f"[INFO] Total overlay clips created: {len(overlay_clips)}")
+            final_video = CompositeVideoClip([video] + overlay_clips)
+
+        counter("sprite_cache", **sprite_cache_stats())
+        final_video = final_video.with_audio(dialogue_audio)
+        with span("render.encode", "render", backend="moviepy", compositor=compositor) as trace:
+            final_video.write_videofile(FINAL_OUTPUT, **moviepy_write_kwargs(render_profile))
+            trace["frames"] = int(video_duration * render_profile["fps"])
+        # Release the soundtrack's reader so the temporary WAV can be deleted (Windows)
+        dialogue_audio.close()
+        return FINAL_OUTPUT
 
 # === RUN SCRIPT ===
 if __name__ == "__main__":
@@ -1,46 +1,167 @@
 # scripts/voice_generator.py
 
+import base64
+import json
 import os
 import random
 import requests
-import tempfile
-from pydub import AudioSegment
-from dotenv import load_dotenv
 import shutil
-
-load_dotenv()
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from scripts.clients import get_elevenlabs_api_key
+from scripts.retry import call_with_retries
+from scripts.tts_cache import TTSCache, CacheStats, normalize_tts_text
+from scripts.caption_alignment import alignment_sidecar_path
+from scripts.tracing import span, counter
 
 # Voice IDs for each character (customize if needed)
 STEWIE_VOICE_ID = "DL63rxhw9dXPUx8xlBxa"
 PETER_VOICE_ID = "oRgIPTyhED338KvRzKFh"
 
-ELEVEN_LABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
-if not ELEVEN_LABS_API_KEY:
-    raise RuntimeError("Please set the ELEVENLABS_API_KEY environment variable.")
+# Override to point at a local stub server when testing
+ELEVEN_LABS_API_URL = os.getenv("ELEVENLABS_API_URL", "https://api.elevenlabs.io/v1/text-to-speech/")
+TTS_MAX_IN_FLIGHT = int(os.getenv("TTS_MAX_IN_FLIGHT", "4"))
+# Requests open at once across the whole process, whatever each caller's
+# max_in_flight: the batch runner has two topics in TTS at a time, each with
+# its own worker pool. Sizes the connection pool too, so none are discarded.
+TTS_MAX_CONNECTIONS = int(os.getenv("TTS_MAX_CONNECTIONS", str(2 * TTS_MAX_IN_FLIGHT)))
+TTS_TIMEOUT = 60
+TTS_RETRIES = 5
+TTS_STREAM_CHUNK = 16 * 1024
+TTS_MODEL_ID = "eleven_multilingual_v2"
+TTS_VOICE_SETTINGS = {
+    "stability": 0.75,
+    "similarity_boost": 0.9
+}
+
+tts_cache = TTSCache()
+_session = None
+_request_slots = threading.BoundedSemaphore(max(TTS_MAX_CONNECTIONS, 1))
+
+
+def tts_params():
+    """Everything besides the script text that changes the synthesized audio."""
+    return {"voices": [STEWIE_VOICE_ID, PETER_VOICE_ID], "model_id": TTS_MODEL_ID,
+            "voice_settings": TTS_VOICE_SETTINGS}
+
+
+class TTSRateLimited(Exception):
+    """Raised on HTTP 429 so the retry loop can honour Retry-After."""
+
+    def __init__(self, retry_after=None):
+        super().__init__(f"ElevenLabs rate limited (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+
+class TTSServerError(Exception):
+    """Raised on HTTP 5xx, which is transient on ElevenLabs' side and worth retrying."""
+
+    def __init__(self, status_code: int, retry_after=None):
+        super().__init__(f"ElevenLabs server error {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
 
-ELEVEN_LABS_API_URL = "https://api.elevenlabs.io/v1/text-to-speech/"
+# Rate limits, 5xx and dropped/timed-out connections (including mid-stream)
+TTS_RETRYABLE_ERRORS = (TTSRateLimited, TTSServerError, requests.ConnectionError, requests.Timeout,
+                        requests.exceptions.ChunkedEncodingError)
 
 
-def tts_generate(voice_id: str, text: str) -> bytes:
+def get_session() -> requests.Session:
     """
-    Calls the ElevenLabs TTS endpoint and returns raw MP3 audio bytes.
+    Returns the shared keep-alive session so concurrent requests reuse
+    pooled TLS connections instead of handshaking per line. Rebuilt if
+    the API key changes (see scripts.clients.set_elevenlabs_api_key).
     """
-    url = ELEVEN_LABS_API_URL + voice_id
-    headers = {
-        "xi-api-key": ELEVEN_LABS_API_KEY,
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "text": text,
-        "model_id": "eleven_multilingual_v2",
-        "voice_settings": {
-            "stability": 0.75,
-            "similarity_boost": 0.9
+    global _session
+    api_key = get_elevenlabs_api_key()
+    if _session is None or _session.headers.get("xi-api-key") != api_key:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(TTS_MAX_CONNECTIONS, 1))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "xi-api-key": api_key,
+            "Content-Type": "application/json"
+        })
+        _session = session
+    return _session
+
+
+def _post_tts(url: str, payload: dict, stream: bool = False) -> bytes:
+    # A slot is held until the response is closed and its connection is back in the pool,
+    # but not across retry waits
+    with _request_slots, span("tts.request", "api", chars=len(payload["text"]), stream=stream) as trace, \
+            get_session().post(url, json=payload, timeout=TTS_TIMEOUT, stream=stream) as response:
+        trace["status"] = response.status_code
+        retry_after = response.headers.get("Retry-After")
+        retry_after = float(retry_after) if retry_after else None
+        if response.status_code == 429:
+            raise TTSRateLimited(retry_after)
+        if response.status_code >= 500:
+            raise TTSServerError(response.status_code, retry_after)
+        response.raise_for_status()
+        if stream:
+            # Chunks arrive while the provider is still synthesizing the tail of the line
+            content = b"".join(response.iter_content(chunk_size=TTS_STREAM_CHUNK))
+        else:
+            content = response.content
+        trace["bytes_in"] = len(content)
+        return content
+
+
+def _cached_tts(voice_id: str, text: str, endpoint: str, suffix: str, use_cache: bool,
+                stream: bool = False, run_stats: CacheStats = None) -> bytes:
+    text = normalize_tts_text(text)
+    key = TTSCache.make_key(voice_id + endpoint, TTS_MODEL_ID, TTS_VOICE_SETTINGS, text)
+    with span("tts.line", "item", endpoint=endpoint or "/", cached=False) as trace:
+        if use_cache:
+            cached = tts_cache.get(key, suffix, run_stats)
+            if cached is not None:
+                trace.update(cached=True, bytes=len(cached))
+                return cached
+
+        # The /stream variant returns the same audio, so it shares cache entries
+        url = ELEVEN_LABS_API_URL + voice_id + endpoint + ("/stream" if stream else "")
+        payload = {
+            "text": text,
+            "model_id": TTS_MODEL_ID,
+            "voice_settings": TTS_VOICE_SETTINGS
         }
-    }
-    response = requests.post(url, json=payload, headers=headers)
-    response.raise_for_status()
-    return response.content
+        content = call_with_retries(
+            _post_tts, url, payload, stream,
+            retries=TTS_RETRIES,
+            retry_on=TTS_RETRYABLE_ERRORS,
+            get_delay=lambda e: getattr(e, "retry_after", None)
+        )
+        trace["bytes"] = len(content)
+        if use_cache:
+            tts_cache.put(key, content, suffix)
+        return content
+
+
+def tts_generate(voice_id: str, text: str, use_cache: bool = True, stream: bool = False,
+                 run_stats: CacheStats = None) -> bytes:
+    """
+    Calls the ElevenLabs TTS endpoint and returns raw MP3 audio bytes.
+    Identical (voice, model, settings, text) requests are served from tts_cache;
+    run_stats, if given, counts this call's cache hit or miss.
+    stream=True uses the chunked /stream endpoint, whose first bytes arrive
+    before the whole line is synthesized.
+    """
+    return _cached_tts(voice_id, text, "", ".mp3", use_cache, stream, run_stats)
+
+
+def tts_generate_with_timestamps(voice_id: str, text: str, use_cache: bool = True,
+                                 run_stats: CacheStats = None) -> tuple[bytes, dict]:
+    """
+    Calls the ElevenLabs with-timestamps endpoint and returns (MP3 bytes,
+    character alignment) for caption timing.
+    """
+    data = json.loads(_cached_tts(voice_id, text, "/with-timestamps", ".json", use_cache,
+                                  run_stats=run_stats))
+    return base64.b64decode(data["audio_base64"]), data.get("alignment") or {}
 
 
 def parse_script(script_path: str) -> list[tuple[str, str]]:
@@ -57,62 +178,101 @@ def parse_script(script_path: str) -> list[tuple[str, str]]:
     return lines
 
 
-def generate_audio(script_lines: list[tuple[str, str]], output_path: str = "output/output.mp3"):
+def stitch_segments(segments: list, min_pause_ms: int = 200, max_pause_ms: int = 400):
     """
-    Generates individual audio files to ./AudioTemp and saves full output.mp3.
+    Joins segments with short random pauses in a single concatenation rather
+    than repeatedly growing (and copying) one AudioSegment.
+    """
+    first = segments[0]
+    frame_rate, channels, sample_width = first.frame_rate, first.channels, first.sample_width
+    parts = []
+    for i, seg in enumerate(segments):
+        seg = seg.set_frame_rate(frame_rate).set_channels(channels).set_sample_width(sample_width)
+        if i > 0:
+            pause_frames = int(frame_rate * random.randint(min_pause_ms, max_pause_ms) / 1000)
+            parts.append(b"\x00" * (pause_frames * first.frame_width))
+        parts.append(seg.raw_data)
+    return first._spawn(b"".join(parts))
+
+
+def assign_voices(script_lines: list[tuple[str, str]]) -> list[tuple[str, str, str, str]]:
+    """
+    Returns [(speaker, text, voice_id, filename), ...] in script order, with
+    per-speaker numbered filenames (Stewie1.mp3, Peter1.mp3, ...).
     """
-    audio_segments = []
-    temp_files = []
-    shutil.rmtree("assets/AudioTemp", ignore_errors=True)
-    os.makedirs("assets/AudioTemp", exist_ok=True)
-    os.makedirs("output", exist_ok=True)
     speaker_counts = {"stewie": 0, "peter": 0}
+    jobs = []
+    for speaker, text in script_lines:
+        key = speaker.lower()
+        if key == "stewie":
+            voice_id = STEWIE_VOICE_ID
+        elif key == "peter":
+            voice_id = PETER_VOICE_ID
+        else:
+            print(f"⚠️ Skipping unknown speaker: {speaker}")
+            continue
+        speaker_counts[key] += 1
+        filename = f"{speaker.capitalize()}{speaker_counts[key]}.mp3"
+        jobs.append((speaker, text, voice_id, filename))
 
-    try:
-        for speaker, text in script_lines:
-            key = speaker.lower()
-            if key == "stewie":
-                voice_id = STEWIE_VOICE_ID
-            elif key == "peter":
-                voice_id = PETER_VOICE_ID
-            else:
-                print(f"⚠️ Skipping unknown speaker: {speaker}")
-                continue
+    if not jobs:
+        raise RuntimeError("No audio segments were created.")
+    return jobs
 
-            print(f"[TTS] {speaker}: {text[:40]}...")
-            audio_bytes = tts_generate(voice_id, text)
 
-            # Save individual clip
-            speaker_counts[key] += 1
-            filename = f"{speaker.capitalize()}{speaker_counts[key]}.mp3"
-            full_path = os.path.join("assets/AudioTemp", filename)
+def generate_audio(script_lines: list[tuple[str, str]], output_path: str = "output/output.mp3",
+                   max_in_flight: int = TTS_MAX_IN_FLIGHT, stitch_preview: bool = True,
+                   with_timestamps: bool = False, audio_dir: str = "assets/AudioTemp"):
+    """
+    Generates individual audio files to audio_dir and, if stitch_preview is
+    set, saves the full output.mp3 preview. Up to max_in_flight lines are
+    synthesized concurrently; files are still numbered and stitched in script order.
+    with_timestamps also writes each line's character timings to a
+    .alignment.json sidecar for caption alignment.
+    """
+    from pydub import AudioSegment
+
+    audio_segments = []
+    shutil.rmtree(audio_dir, ignore_errors=True)
+    os.makedirs(audio_dir, exist_ok=True)
+
+    # Assign voices and filenames up front so completion order doesn't matter
+    jobs = assign_voices(script_lines)
+    run_stats = CacheStats()
+
+    def synthesize(job):
+        speaker, text, voice_id, _ = job
+        print(f"[TTS] {speaker}: {text[:40]}...")
+        if with_timestamps:
+            return tts_generate_with_timestamps(voice_id, text, run_stats=run_stats)
+        return tts_generate(voice_id, text, run_stats=run_stats), None
+
+    with ThreadPoolExecutor(max_workers=max(max_in_flight, 1)) as pool:
+        for (speaker, text, voice_id, filename), (audio_bytes, alignment) in zip(jobs, pool.map(synthesize, jobs)):
+            # Save individual clip; decode it once only if we're building the preview
+            full_path = os.path.join(audio_dir, filename)
             with open(full_path, "wb") as f:
                 f.write(audio_bytes)
+            if alignment:
+                with open(alignment_sidecar_path(full_path), "w", encoding="utf-8") as f:
+                    json.dump(alignment, f)
+            if stitch_preview:
+                audio_segments.append(AudioSegment.from_file(full_path, format="mp3"))
 
-            # Save to temp and load with pydub
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".mp3")
-            tmp.write(audio_bytes)
-            tmp.flush()
-            tmp.close()
-            temp_files.append(tmp.name)
-            segment = AudioSegment.from_file(tmp.name)
-            audio_segments.append(segment)
-
-        if not audio_segments:
-            raise RuntimeError("No audio segments were created.")
-
-        # Stitch final audio
-        combined = audio_segments[0]
-        for seg in audio_segments[1:]:
-            pause = AudioSegment.silent(duration=random.randint(200, 400))
-            combined += pause + seg
-
-        combined.export(output_path, format="mp3")
+    if stitch_preview:
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        stitch_segments(audio_segments).export(output_path, format="mp3")
         print(f"✅ Final audio saved to: {output_path}")
 
-    finally:
-        for tmp in temp_files:
-            try:
-                os.remove(tmp)
-            except:
-                pass
+    finish_tts_cache(run_stats)
+
+
+def finish_tts_cache(run_stats: CacheStats = None):
+    """
+    Evicts over-budget cache entries and reports this run's hit rate
+    (run_stats; without it, the cache's lifetime totals).
+    """
+    tts_cache.evict()
+    stats = (run_stats or tts_cache.totals).as_dict()
+    print(f"[TTS cache] {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+    counter("tts_cache", **stats)
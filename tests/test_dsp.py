@@ -0,0 +1,35 @@
+# tests/test_dsp.py
+
+import numpy as np
+import pytest
+from benchmarks.fixtures import synthetic_speech
+from scripts.audio_postprocess import process_stewie, process_peter
+from scripts.dsp import process_segment, segment_to_array
+
+# Octave bands (Hz) covering the voice chains' filters and the Stewie nasal boost
+BANDS = [(62, 125), (125, 250), (250, 500), (500, 1000), (1000, 2000), (2000, 4000), (4000, 8000)]
+
+
+def _band_levels(audio) -> np.ndarray:
+    x = segment_to_array(audio).mean(axis=1)
+    power = np.abs(np.fft.rfft(x)) ** 2
+    freqs = np.fft.rfftfreq(len(x), 1.0 / audio.frame_rate)
+    return np.array([10 * np.log10(power[(freqs >= lo) & (freqs < hi)].sum() + 1e-9) for lo, hi in BANDS])
+
+
+@pytest.fixture(scope="module")
+def speech():
+    return synthetic_speech(10)
+
+
+@pytest.mark.parametrize("speaker, reference", [("stewie", process_stewie), ("peter", process_peter)])
+def test_numpy_chain_matches_pydub(speech, speaker, reference):
+    expected = reference(speech)
+    actual = process_segment(speech, speaker)
+
+    assert len(actual) == len(expected)
+    assert actual.dBFS == pytest.approx(expected.dBFS, abs=0.1)
+    # Bands well below the chains' passband carry little energy; compare where it matters
+    expected_bands, actual_bands = _band_levels(expected), _band_levels(actual)
+    audible = expected_bands > expected_bands.max() - 40
+    assert np.abs(actual_bands - expected_bands)[audible].max() < 0.25